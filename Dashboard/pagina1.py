@@ -1,30 +1,16 @@
 # Dashboard/pagina1.py
-import os
-import sys
-
 import streamlit as st
 
-# ================== RUTAS / IMPORTS ==================
-THIS_DIR = os.path.dirname(__file__)
-ROOT_DIR = os.path.dirname(THIS_DIR)
-
-if ROOT_DIR not in sys.path:
-    sys.path.insert(0, ROOT_DIR)
-
-from ui.theme_dark import apply_theme
+# ================== IMPORTS ==================
+from ui.theme_dark import inject_kpi_styles
 from ml.ml_analysis import load_bundle
 from ml.model_dashboard import run_model_dashboard
 
 # ================== CONFIG GLOBAL DE LA PÁGINA ==================
 st.set_page_config(page_title="Predicción de delitos – Página 1", layout="wide")
-apply_theme()
 
 # ================== INYECTAR CSS DE KPIs ==================
-kpi_css_path = os.path.join(ROOT_DIR, "ui", "kpi_styles.css")
-if os.path.exists(kpi_css_path):
-    with open(kpi_css_path) as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-else:
+if not inject_kpi_styles():
     st.warning("No se encontró ui/kpi_styles.css. Verifica la ruta del CSS de KPIs.")
 
 
@@ -34,7 +20,12 @@ def get_bundle():
     return load_bundle()
 
 
-bundle = get_bundle()
+# La referencia se guarda en session_state: los reruns de la sesión
+# reutilizan el mismo objeto sin pasar por la caché; la primera carga
+# sigue compartida entre sesiones vía cache_resource.
+if "bundle" not in st.session_state:
+    st.session_state.bundle = get_bundle()
+bundle = st.session_state.bundle
 
 # ================== CORRER TODO EL DASHBOARD DEL MODELO ==================
 run_model_dashboard(bundle)
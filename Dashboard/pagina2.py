@@ -1,7 +1,6 @@
 # Dashboard/pagina2.py
 import streamlit as st
-from ui.theme_dark import apply_theme
-from core.data_loader import load_central_dataset
+from core.data_loader import dataset_version, load_central_dataset
 
 from components.charts_eda import (
     render_top5_crimes_bar,
@@ -11,12 +10,11 @@ from components.charts_eda import (
 )
 
 
-# --- Initial configuration and global theme ---
+# --- Initial configuration (global theme is applied in Main.py) ---
 st.set_page_config(
     page_title="Tendencias Históricas del Crimen (2016–2024)",
     layout="wide",
 )
-apply_theme()
 
 st.title("Tendencias Históricas del Crimen (2016–2024)")
 st.caption("A través de estas visualizaciones podrás identificar patrones, tendencias y variaciones " \
@@ -30,11 +28,29 @@ st.divider()
 df = load_central_dataset()
 
 
-# --- Sidebar filters for this dashboard ---
-with st.sidebar:
+@st.cache_data(show_spinner=False)
+def _unique_sorted_cached(version: str, col: str, _df) -> list:
+    """Cached _unique_sorted, once per dataset version and column."""
+    return sorted(_df[col].dropna().unique().tolist())
+
+
+def _unique_sorted(df, col: str) -> list:
+    """
+    Sorted non-null unique values of `col`. The frame is identified by its
+    dataset_version, so reloading the dataset refreshes the options; a
+    frame without a version is not cached.
+    """
+    version = dataset_version(df)
+    if version is None:
+        return sorted(df[col].dropna().unique().tolist())
+    return _unique_sorted_cached(version, col, df)
+
+
+# --- Sidebar filters for this dashboard (applied together on submit) ---
+with st.sidebar.form("p2_filtros"):
     st.subheader("Filtros del Dashboard")
 
-    zonas = ["Todas"] + sorted(df["region_cdmx"].dropna().unique().tolist())
+    zonas = ["Todas"] + _unique_sorted(df, "region_cdmx")
     zona = st.selectbox("Zona", zonas, key="p2_zona")
 
     hora_rango = st.slider(
@@ -46,19 +62,21 @@ with st.sidebar:
         key="p2_hora_rango",
     )
 
-    meses = ["Todos"] + sorted(df["mes_hecho"].dropna().unique().tolist())
+    meses = ["Todos"] + _unique_sorted(df, "mes_hecho")
     mes = st.selectbox("Mes", meses, key="p2_mes")
 
-    dias = ["Todos"] + sorted(df["dia"].dropna().unique().tolist())
+    dias = ["Todos"] + _unique_sorted(df, "dia")
     dia_semana = st.selectbox("Día de la semana", dias, key="p2_dia_semana")
 
-    delitos_unicos = sorted(df["delito_grupo_macro"].dropna().unique().tolist())
+    delitos_unicos = _unique_sorted(df, "delito_grupo_macro")
     tipos_crimen = st.multiselect(
         "Tipo de crimen",
         delitos_unicos,
         key="p2_tipos_crimen",
     )
 
+    st.form_submit_button("Aplicar filtros", use_container_width=True)
+
 
 # --- Main layout: two-column structure ---
 col1, col2 = st.columns(2)
@@ -100,7 +118,7 @@ with col2:
     st.subheader("Composición Mensual de Delitos (%)")
     render_monthly_stacked_percent(
         df,
-        hora_rango,
+        hour_range=hora_rango,
         mes=mes,
         zona=zona,
         tipos_crimen=tipos_crimen,
@@ -1,15 +1,13 @@
 # Dashboard/pagina3.py
 import streamlit as st
-from ui.theme_dark import apply_theme
 from chatbot.chatbot_app import run_chatbot_page
 
 
-# --- Initial configuration and global theme ---
+# --- Initial configuration (global theme is applied in Main.py) ---
 st.set_page_config(
     page_title="Consultor Inteligente de Datos",
     layout="wide",
 )
-apply_theme()
 
 
 # --- Page header ---
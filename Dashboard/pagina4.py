@@ -1,22 +1,27 @@
+import io
 import os
-import sys
 import json
+import hashlib
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-from ui.theme_dark import apply_theme
-from core.data_loader import load_central_dataset, DATASET_PATH
-from EDA.eda_pipeline import run_eda_for_upload
-from EDA.eda_streamlit_views import render_eda_dashboard
+from ui.theme_dark import UI_DIR, inject_css_file
+from core.data_loader import (
+    active_dataset_path,
+    combine_with_central,
+    load_central_dataset,
+    save_central_dataset,
+)
 
 
-# --- Initial configuration and global theme ---
+# --- Initial configuration (global theme is applied in Main.py) ---
 st.set_page_config(
     page_title="Integración & EDA de Datos",
     layout="wide",
 )
-apply_theme()
+inject_css_file(UI_DIR / "pagina4_styles.css")
 
 
 # --- Paths and EDA configuration ---
@@ -24,12 +29,89 @@ THIS_DIR = os.path.dirname(__file__)
 ROOT_DIR = os.path.dirname(THIS_DIR)
 EDA_DIR = os.path.join(ROOT_DIR, "EDA")
 
-if ROOT_DIR not in sys.path:
-    sys.path.insert(0, ROOT_DIR)
-
 REGEX_JAM_PATH = os.path.join(EDA_DIR, "regex_config.jam")
 
 
+# --- Upload parsing and EDA (cached by file content hash) ---
+def _read_any(content: bytes, name: str) -> pd.DataFrame:
+    """Read uploaded file as CSV or Parquet."""
+    buffer = io.BytesIO(content)
+    if name.lower().endswith(".parquet"):
+        return pd.read_parquet(buffer, engine="pyarrow")
+    try:
+        # Multi-threaded C++ parser; much faster than the default engine
+        return pd.read_csv(buffer, engine="pyarrow")
+    except Exception:
+        # Fallback for files the strict Arrow parser rejects
+        # (ragged rows, non-UTF-8 text, ...)
+        buffer.seek(0)
+        return pd.read_csv(buffer, low_memory=False)
+
+
+def _file_mtime(path: str | None) -> float | None:
+    """Modification time used to invalidate cached results when a file changes."""
+    return os.path.getmtime(path) if path and os.path.exists(path) else None
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _parse_upload(file_hash: str, name: str, _content: bytes) -> pd.DataFrame:
+    """Parse the upload once per file content (`_content` is not hashed)."""
+    return _read_any(_content, name)
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _run_eda_cached(
+    file_hash: str,
+    clima_csv_path: str | None,
+    clima_mtime: float | None,
+    regex_mtime: float | None,
+    _df_raw: pd.DataFrame,
+):
+    """Run the EDA pipeline once per (file, weather file, regex config)."""
+    from EDA.eda_pipeline import run_eda_for_upload
+
+    return run_eda_for_upload(
+        df_raw=_df_raw,
+        clima_csv_path=clima_csv_path,
+        regex_config_path=REGEX_JAM_PATH,
+    )
+
+
+def _audit_default(obj):
+    """json.dumps hook: DataFrames as records, numpy scalars as Python values."""
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient="records")
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _audit_json_bytes(eda_key: tuple, _stats: dict) -> bytes:
+    """EDA audit as UTF-8 JSON, serialized once per EDA run (`eda_key`)."""
+    return json.dumps(
+        _stats,
+        ensure_ascii=False,
+        indent=2,
+        default=_audit_default,
+    ).encode("utf-8")
+
+
+# --- Download payloads (cached: only re-serialized when the frame changes) ---
+@st.cache_data(show_spinner=False, max_entries=4)
+def _df_to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """Serialize a DataFrame as UTF-8 CSV for st.download_button."""
+    return df.to_csv(index=False).encode("utf-8")
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _df_to_parquet_bytes(df: pd.DataFrame) -> bytes:
+    """Serialize a DataFrame as ZSTD Parquet for st.download_button."""
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, engine="pyarrow", compression="zstd", index=False)
+    return buffer.getvalue()
+
+
 def main():
     """Main entrypoint for the EDA & data integration page."""
 
@@ -47,13 +129,9 @@ def main():
         st.markdown(
             f"""
             <div class="panel-card">
-              <div style="font-size:0.75rem; text-transform:uppercase; letter-spacing:.14em; opacity:.8;">
-                Dataset histórico activo
-              </div>
-              <div style="font-size:1.3rem; font-weight:600; margin-top:0.25rem;">
-                {os.path.basename(DATASET_PATH)}
-              </div>
-              <div style="font-size:0.9rem; opacity:0.85; margin-top:0.2rem;">
+              <div class="panel-kicker">Dataset histórico activo</div>
+              <div class="panel-title">{active_dataset_path().name}</div>
+              <div class="panel-sub">
                 {len(central_df):,} registros · {central_df.shape[1]} columnas
               </div>
             </div>
@@ -66,9 +144,7 @@ def main():
         st.markdown(
             """
             <div class="panel-card">
-              <div style="font-size:0.8rem; text-transform:uppercase; letter-spacing:.14em; opacity:.8;">
-                Subir nuevos registros
-              </div>
+              <div class="panel-kicker panel-kicker-lg">Subir nuevos registros</div>
             </div>
             """,
             unsafe_allow_html=True,
@@ -115,16 +191,17 @@ def main():
         )
         return
 
-    # --- Generic file reader (CSV / Parquet) ---
-    def _read_any(file) -> pd.DataFrame:
-        """Read uploaded file as CSV or Parquet."""
-        name = file.name.lower()
-        if name.endswith(".csv"):
-            return pd.read_csv(file)
-        return pd.read_parquet(file)
+    # --- Deferred import: the EDA stack (regex, Plotly) is only loaded
+    # once there is a file to process ---
+    from EDA.eda_pipeline import restore_original_dtypes
+    from EDA.eda_streamlit_views import render_eda_dashboard
+
+    # Content hash: reruns with the same file reuse the cached parse and EDA
+    content = uploaded.getvalue()
+    file_hash = hashlib.blake2b(content, digest_size=16).hexdigest()
 
     try:
-        nuevos_raw = _read_any(uploaded)
+        nuevos_raw = _parse_upload(file_hash, uploaded.name, content)
     except Exception as e:
         st.error(f"Error al leer el archivo subido: {e}")
         return
@@ -152,11 +229,17 @@ def main():
 
     # --- Run EDA pipeline for the new batch ---
     with st.spinner("Ejecutando EDA sobre los nuevos registros…"):
-        nuevos_clean, stats = run_eda_for_upload(
-            df_raw=nuevos_raw,
-            clima_csv_path=clima_csv,
-            regex_config_path=REGEX_JAM_PATH,
+        eda_key = (
+            file_hash,
+            clima_csv,
+            _file_mtime(clima_csv),
+            _file_mtime(REGEX_JAM_PATH),
         )
+        nuevos_clean, stats = _run_eda_cached(*eda_key, nuevos_raw)
+
+    # The pipeline shrinks dtypes for the in-memory dashboard; exports and
+    # the saved dataset use the original ones
+    nuevos_export = restore_original_dtypes(nuevos_clean)
 
     st.success("EDA completado sobre el lote nuevo.")
     st.write(
@@ -167,14 +250,14 @@ def main():
     # --- Incremental integration with central historical dataset ---
     st.subheader("Integración con el dataset histórico")
 
-    all_cols = sorted(set(central_df.columns) | set(nuevos_clean.columns))
-    central_aligned = central_df.reindex(columns=all_cols)
-    nuevos_aligned = nuevos_clean.reindex(columns=all_cols)
-
-    combined_df = pd.concat([central_aligned, nuevos_aligned], ignore_index=True)
+    # The combined frame is only built by the actions that need it
+    # (overwrite / download); everything else just needs the counts.
+    def _build_combined() -> pd.DataFrame:
+        return combine_with_central(central_df, nuevos_export)
 
     st.write(
-        f"**Total combinado (sin deduplicar):** {len(combined_df):,} registros "
+        f"**Total combinado (sin deduplicar):** "
+        f"{len(central_df) + len(nuevos_clean):,} registros "
         f"(dataset histórico: {len(central_df):,} + lote nuevo: {len(nuevos_clean):,})"
     )
 
@@ -192,8 +275,10 @@ def main():
         )
         if confirm and st.button("Sobrescribir dataset histórico"):
             try:
-                combined_df.to_csv(DATASET_PATH, index=False)
-                st.success("Dataset histórico actualizado correctamente.")
+                saved_path = save_central_dataset(_build_combined())
+                st.success(
+                    f"Dataset histórico actualizado correctamente ({saved_path.name})."
+                )
             except Exception as e:
                 st.error(f"Error al guardar el dataset histórico: {e}")
 
@@ -202,7 +287,7 @@ def main():
         st.caption("Descargar lote limpio")
         st.download_button(
             "Nuevos limpios (CSV)",
-            data=nuevos_clean.to_csv(index=False).encode("utf-8"),
+            data=_df_to_csv_bytes(nuevos_export),
             file_name="nuevos_limpios.csv",
             mime="text/csv",
         )
@@ -210,31 +295,31 @@ def main():
     # Download combined dataset
     with c3:
         st.caption("Descargar dataset combinado")
-        st.download_button(
-            "Dataset combinado (CSV)",
-            data=combined_df.to_csv(index=False).encode("utf-8"),
-            file_name="dataset_combinado.csv",
-            mime="text/csv",
-        )
+        if st.checkbox("Preparar dataset combinado", key="chk_combined_download"):
+            combined_df = _build_combined()
+            try:
+                st.download_button(
+                    "Dataset combinado (Parquet)",
+                    data=_df_to_parquet_bytes(combined_df),
+                    file_name="dataset_combinado.parquet",
+                    mime="application/vnd.apache.parquet",
+                )
+            except Exception:
+                # Mixed-type object columns cannot be written to Parquet
+                st.download_button(
+                    "Dataset combinado (CSV)",
+                    data=_df_to_csv_bytes(combined_df),
+                    file_name="dataset_combinado.csv",
+                    mime="text/csv",
+                )
 
     # Download EDA audit
     with c4:
         st.caption("Descargar auditoría del EDA")
 
-        stats_json_ready = {}
-        for key, value in stats.items():
-            if isinstance(value, pd.DataFrame):
-                stats_json_ready[key] = value.to_dict(orient="records")
-            else:
-                stats_json_ready[key] = value
-
         st.download_button(
             "Auditoría (JSON)",
-            data=json.dumps(
-                stats_json_ready,
-                ensure_ascii=False,
-                indent=2,
-            ).encode("utf-8"),
+            data=_audit_json_bytes(eda_key, stats),
             file_name="eda_stats_lote_nuevo.json",
             mime="application/json",
         )
@@ -243,7 +328,7 @@ def main():
 
     # --- EDA dashboard for the new batch ---
     st.subheader("Dashboard del EDA para el lote nuevo")
-    render_eda_dashboard(nuevos_clean, combined_df, stats)
+    render_eda_dashboard(nuevos_clean, stats, eda_key)
 
     st.divider()
 
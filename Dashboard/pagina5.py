@@ -9,24 +9,12 @@ This page:
 - Provides a base layout for charts and maps.
 """
 
-import os
-import sys
-from pathlib import Path
-
 import streamlit as st
 
-# ---------------------------------------------------------------------
-# Path setup so core and interactive modules can be imported
-# ---------------------------------------------------------------------
-THIS_DIR = os.path.dirname(__file__)
-ROOT_DIR = os.path.dirname(THIS_DIR)
-if ROOT_DIR not in sys.path:
-    sys.path.insert(0, ROOT_DIR)
-
 # ---------------------------------------------------------------------
 # Project imports
 # ---------------------------------------------------------------------
-from ui.theme_dark import apply_theme
+from ui.theme_dark import inject_kpi_styles
 from core.data_loader import load_central_dataset
 from interactive_dashboard.filters import render_filters
 from interactive_dashboard.kpis import compute_kpis, render_kpi_cards
@@ -42,14 +30,8 @@ st.set_page_config(
     layout="wide",
 )
 
-# Apply global dark theme styles for consistency across the app.
-apply_theme()
-
 # Load external CSS for KPI cards
-CSS_PATH = Path(ROOT_DIR) / "ui" / "kpi_styles.css"
-if CSS_PATH.exists():
-    with open(CSS_PATH, "r") as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+inject_kpi_styles()
 
 
 # ---------------------------------------------------------------------
@@ -1,25 +1,33 @@
 # eda_pipeline.py
 # Orquesta el EDA completo. Pensado para usarse desde Streamlit.
 
+import os
 from pathlib import Path
-from typing import Tuple, Dict, Optional
+from typing import Tuple, Dict, Optional, Sequence
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
 from .update_base import (
-    robust_read_csv,
+    read_table_file,
+    write_table_file,
+    _has_binary_columns,
     report_missing_values,
     report_duplicates_full,
     cross_fill_colonias,
     fill_competencia,
     fill_latlng_medians,
     preview_drop_sparse,
+    parse_date_flex,
     add_weekday_features,
     add_quincena_window,
     add_weather_by_alcaldia_fecha,
     asignar_region,
     mes_a_espanol,
-    clasificar_hora,
+    clasificar_hora_series,
 )
 from .regex_loader import classify_regex
 
@@ -29,6 +37,156 @@ from .regex_loader import classify_regex
 # ------------------------------------------------------------
 
 
+# Tipo con el que el pipeline entregaba las columnas que ahora produce como
+# categóricas; restore_original_dtypes lo recupera al exportar o guardar.
+# Las columnas del archivo subido que se vuelven categóricas recuperan su
+# tipo de entrada
+_TIPOS_PLANOS = {
+    "mes_hecho": object,
+    "mes_inicio": object,
+    "region_cdmx": object,
+    "periodo_hora": object,
+    "clima_condicion": object,
+    "delito_grupo": "string",
+    "delito_grupo_macro": "string",
+    "clase_violencia": "string",
+    "dia_hecho": "string",
+    "quincena_window": "string",
+}
+
+_DIAS_SEMANA = ["LUNES", "MARTES", "MIERCOLES", "JUEVES", "VIERNES", "SABADO", "DOMINGO"]
+
+
+def _map_categorico(s: pd.Series, func) -> pd.Series:
+    """
+    Aplica `func` una sola vez por valor distinto de `s` (los nulos incluidos)
+    y devuelve el resultado como categórica alineada a `s`.
+    """
+    codes, uniques = pd.factorize(s, use_na_sentinel=False)
+    valores = pd.Categorical([func(u) for u in uniques])
+    return pd.Series(
+        pd.Categorical.from_codes(valores.codes[codes], dtype=valores.dtype),
+        index=s.index,
+    )
+
+
+def _row_ids(df: pd.DataFrame) -> np.ndarray:
+    """
+    Id entero por fila: filas idénticas (nulos incluidos) comparten id.
+    """
+    if df.shape[1] == 0:
+        return np.zeros(len(df), dtype=np.intp)
+    return (
+        df.groupby(list(df.columns), dropna=False, sort=False, observed=True)
+        .ngroup()
+        .to_numpy()
+    )
+
+
+def _marcas_duplicados(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Máscaras (duplicada con keep=False, primera aparición) de las filas de df.
+    Un hash de 64 bits por fila descarta de una vez las filas únicas; solo
+    las que comparten hash se confirman con la comparación exacta de
+    _row_ids, así que una colisión nunca cuenta como duplicado.
+    """
+    n = len(df)
+    if df.shape[1] == 0 or df.columns.has_duplicates:
+        ids = _row_ids(df)
+        es_dup = np.bincount(ids)[ids] > 1 if n else np.zeros(0, dtype=bool)
+        return es_dup, ~pd.Series(ids).duplicated().to_numpy()
+
+    # -0.0 y 0.0 son iguales al comparar pero no al hashear
+    flotantes = {
+        c: df[c] + 0.0 for c in df.columns if pd.api.types.is_float_dtype(df[c])
+    }
+    h = pd.util.hash_pandas_object(df.assign(**flotantes), index=False)
+    candidatas = np.flatnonzero(h.duplicated(keep=False).to_numpy())
+
+    es_dup = np.zeros(n, dtype=bool)
+    primera = np.ones(n, dtype=bool)
+    if len(candidatas):
+        ids = _row_ids(df.iloc[candidatas])
+        es_dup[candidatas] = np.bincount(ids)[ids] > 1
+        primera[candidatas] = ~pd.Series(ids).duplicated().to_numpy()
+    return es_dup, primera
+
+
+def _mem_bytes(df: pd.DataFrame, n_muestra: int = 10_000) -> int:
+    """
+    Memoria aproximada de `df` en bytes. Solo las columnas de texto recorren
+    sus objetos, y en lotes grandes sobre una muestra de filas repartidas a
+    lo largo del df (el resultado se escala al total).
+    """
+    n = len(df)
+    if n <= n_muestra:
+        return int(df.memory_usage(deep=True).sum())
+    texto = set(df.select_dtypes(include=["object", "string"]).columns)
+    pos = np.linspace(0, n - 1, n_muestra).astype(np.intp)
+    total = df.index.memory_usage(deep=True)
+    for col in df.columns:
+        s = df[col]
+        if col in texto:
+            total += s.iloc[pos].memory_usage(deep=True, index=False) * (n / n_muestra)
+        else:
+            total += s.memory_usage(deep=True, index=False)
+    return int(total)
+
+
+def _shrink_dtypes(df: pd.DataFrame, max_ratio: float = 0.5) -> pd.DataFrame:
+    """
+    Reduce los tipos del lote limpio en memoria: enteros al tipo más chico
+    que conserva los valores y texto repetitivo (distintos/filas < max_ratio)
+    a categórica. Ambos cambios son sin pérdida; los flotantes (lat/lng,
+    temperatura) se quedan en float64 porque float32 alteraría los valores.
+    Fecha y hora se dejan como están.
+
+    Los tipos originales quedan en df.attrs["dtypes_originales"] (junto con
+    los de las categóricas que arman los pasos previos, ver
+    run_eda_for_upload) para que restore_original_dtypes los recupere antes
+    de exportar o guardar.
+    """
+    nuevos = {}
+    for col in df.columns:
+        s = df[col]
+        if col in ("fecha_hecho", "hora_hecho") or isinstance(
+            s.dtype, pd.CategoricalDtype
+        ):
+            continue
+        if pd.api.types.is_bool_dtype(s) or pd.api.types.is_datetime64_any_dtype(s):
+            continue
+        if pd.api.types.is_integer_dtype(s):
+            tipo = "unsigned" if s.notna().any() and s.min() >= 0 else "integer"
+            nuevos[col] = pd.to_numeric(s, downcast=tipo)
+        elif pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+            if len(s) and s.nunique(dropna=True) / len(s) < max_ratio:
+                nuevos[col] = s.astype("category")
+    originales = {
+        col: df[col].dtype for col, s in nuevos.items() if s.dtype != df[col].dtype
+    }
+    if not originales:
+        return df
+    # Columnas completas sustituidas: el resto del df no se copia
+    df = df.assign(**{col: nuevos[col] for col in originales})
+    df.attrs["dtypes_originales"] = originales
+    return df
+
+
+def restore_original_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Devuelve a su tipo original las columnas que el pipeline reduce o vuelve
+    categóricas (df.attrs["dtypes_originales"]), para que lo exportado o
+    guardado tenga los tipos de siempre y no columnas de diccionario.
+    """
+    originales = df.attrs.get("dtypes_originales", {})
+    casts = {
+        col: dtype
+        for col, dtype in originales.items()
+        if col in df.columns and df[col].dtype != dtype
+    }
+    return df.astype(casts) if casts else df
+
+
 def run_eda_for_upload(
     df_raw: pd.DataFrame,
     clima_csv_path: Optional[str] = None,
@@ -56,29 +214,38 @@ def run_eda_for_upload(
 
     stats_global: Dict = {}
 
-    # Copia para no modificar el original
-    df = df_raw.copy()
+    # Copia superficial: comparte los arreglos con df_raw sin duplicarlos.
+    # Los pasos (inplace=True) solo reemplazan columnas completas, así que
+    # df_raw nunca se modifica
+    df = df_raw.copy(deep=False)
+    tipos_entrada = df_raw.dtypes
 
     # --------------------------------------------------------
     # Diagnóstico inicial
     # --------------------------------------------------------
     stats_global["shape_inicial"] = df.shape
-    stats_global["mem_mb_inicial"] = round(
-        df.memory_usage(deep=True).sum() / (1024**2), 2
-    )
+    stats_global["mem_mb_inicial"] = round(_mem_bytes(df) / (1024**2), 2)
     stats_global["missing_top20"] = report_missing_values(df).head(20)
     stats_global["duplicates_full"] = report_duplicates_full(df)
 
     # --------------------------------------------------------
     # Cross-fill colonias
     # --------------------------------------------------------
-    df, s_col = cross_fill_colonias(df, "colonia_hecho", "colonia_catalogo")
+    df, s_col = cross_fill_colonias(
+        df, "colonia_hecho", "colonia_catalogo", inplace=True
+    )
     stats_global["cross_fill_colonias"] = s_col
 
+    # Alcaldía y colonia se agrupan, cruzan y mapean en varios pasos: como
+    # categóricas cada paso trabaja sobre códigos enteros en vez de textos
+    for col in ("alcaldia_hecho", "colonia_hecho"):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
     # --------------------------------------------------------
     # Imputación competencia
     # --------------------------------------------------------
-    df, s_comp = fill_competencia(df)
+    df, s_comp = fill_competencia(df, inplace=True)
     stats_global["fill_competencia"] = s_comp
 
     # --------------------------------------------------------
@@ -91,18 +258,25 @@ def run_eda_for_upload(
         violencia_col="clase_violencia",
         pasajero_col="robo_pasajero",
         regex_config_path=regex_config_path,
+        inplace=True,
     )
     stats_global["regex"] = s_regex
 
     # --------------------------------------------------------
     # Features de calendario (día de la semana, quincena)
     # --------------------------------------------------------
+    fechas = None
     if "fecha_hecho" in df.columns:
+        # Un solo parseo de la fecha para las features de calendario y el
+        # cruce con clima
+        fechas = parse_date_flex(df["fecha_hecho"])
         df = add_weekday_features(
             df,
             date_col="fecha_hecho",
             name_col="dia_hecho",
             num_col="dia_hecho_num",
+            inplace=True,
+            fechas=fechas,
         )
         df = add_quincena_window(
             df,
@@ -111,12 +285,21 @@ def run_eda_for_upload(
             out_col="quincena_window",
             in_label="Ventana",
             out_label="No_ventana",
+            inplace=True,
+            fechas=fechas,
+        )
+        # Etiquetas de pocos valores como categóricas (códigos int8) para
+        # los conteos y groupby del dashboard; el día sale directo de su número
+        dia_codes = df["dia_hecho_num"].fillna(0).to_numpy(dtype="int64") - 1
+        df["dia_hecho"] = pd.Categorical.from_codes(dia_codes, categories=_DIAS_SEMANA)
+        df["quincena_window"] = df["quincena_window"].astype(
+            pd.CategoricalDtype(categories=["Ventana", "No_ventana"])
         )
 
     # --------------------------------------------------------
     # Imputación lat/long por medianas
     # --------------------------------------------------------
-    df, s_latlng = fill_latlng_medians(df)
+    df, s_latlng = fill_latlng_medians(df, inplace=True)
     stats_global["latlng"] = s_latlng
 
     # --------------------------------------------------------
@@ -128,6 +311,7 @@ def run_eda_for_upload(
             clima_csv_path=clima_csv_path,
             alcaldia_col="alcaldia_hecho",
             date_col="fecha_hecho",
+            fechas=fechas,
         )
     else:
         # Si no hay clima, sólo registramos que no se enriqueció
@@ -140,49 +324,60 @@ def run_eda_for_upload(
 
     # Normalizar clima_condicion → Soleado / Lluvia (si existe)
     if "clima_condicion" in df.columns:
-        df["clima_condicion"] = (
-            df["clima_condicion"]
-            .astype("string")
-            .str.replace(",", "", regex=False)
-            .str.strip()
-            .str.lower()
+        # Son unas cuantas condiciones distintas: las operaciones de texto
+        # corren sobre los valores únicos y el resultado se expande con take
+        codes, uniques = pd.factorize(df["clima_condicion"], use_na_sentinel=False)
+        # Limpieza y búsqueda con kernels de Arrow, sin Series intermedias
+        cond = pa.array(pd.Series(uniques, dtype=object).astype("string"), type=pa.string())
+        cond = pc.utf8_lower(pc.utf8_trim_whitespace(pc.replace_substring(cond, ",", "")))
+
+        def _busca(patron: str) -> np.ndarray:
+            hit = pc.match_substring_regex(cond, patron)
+            return hit.fill_null(False).to_numpy(zero_copy_only=False)
+
+        # Lluvia tiene prioridad sobre soleado; el resto queda en None
+        es_lluvia = _busca("rain|snow")
+        es_soleado = _busca("clear|overcast|partly|partial")
+        etiquetas = np.select([es_lluvia, es_soleado], [0, 1], default=-1)
+        df["clima_condicion"] = pd.Categorical.from_codes(
+            etiquetas[codes], categories=["Lluvia", "Soleado"]
         )
 
-        def _map_weather(x: Optional[str]) -> Optional[str]:
-            if x is None or pd.isna(x):
-                return None
-            if "rain" in x or "snow" in x:
-                return "Lluvia"
-            if "clear" in x or "overcast" in x or "partly" in x or "partial" in x:
-                return "Soleado"
-            return None
-
-        df["clima_condicion"] = df["clima_condicion"].map(_map_weather)
-
     # --------------------------------------------------------
     # Región CDMX
     # --------------------------------------------------------
     if "alcaldia_hecho" in df.columns:
-        df["region_cdmx"] = df["alcaldia_hecho"].map(asignar_region)
+        df["region_cdmx"] = _map_categorico(df["alcaldia_hecho"], asignar_region)
 
     # --------------------------------------------------------
     # Meses a español
     # --------------------------------------------------------
     if "mes_inicio" in df.columns:
-        df["mes_inicio"] = df["mes_inicio"].map(mes_a_espanol)
+        df["mes_inicio"] = _map_categorico(df["mes_inicio"], mes_a_espanol)
     if "mes_hecho" in df.columns:
-        df["mes_hecho"] = df["mes_hecho"].map(mes_a_espanol)
+        df["mes_hecho"] = _map_categorico(df["mes_hecho"], mes_a_espanol)
 
     # --------------------------------------------------------
     # Hora → periodo del día
     # --------------------------------------------------------
     if "hora_hecho" in df.columns:
-        df["hora_hecho"] = pd.to_datetime(
-            df["hora_hecho"],
+        # Hay a lo más 86 400 horas distintas: se parsean y clasifican solo
+        # los valores únicos y se expanden con los códigos de factorize
+        codes, uniques = pd.factorize(df["hora_hecho"], use_na_sentinel=False)
+        horas = pd.to_datetime(
+            pd.Series(uniques, dtype=object),
             format="%H:%M:%S",
             errors="coerce",
-        ).dt.time
-        df["periodo_hora"] = df["hora_hecho"].apply(clasificar_hora)
+        )
+        df["hora_hecho"] = pd.Series(
+            horas.dt.time.to_numpy(dtype=object)[codes], index=df.index
+        )
+        # Periodo como categórica: tres etiquetas, un código int8 por fila
+        periodos = pd.Categorical(clasificar_hora_series(horas))
+        df["periodo_hora"] = pd.Series(
+            pd.Categorical.from_codes(periodos.codes[codes], dtype=periodos.dtype),
+            index=df.index,
+        )
 
     # --------------------------------------------------------
     # Drop columnas poco útiles / redundantes
@@ -198,16 +393,20 @@ def run_eda_for_upload(
     # --------------------------------------------------------
     # Deduplicación exacta
     # --------------------------------------------------------
-    dups_before = int(df.duplicated(keep=False).sum())
+    # Un solo paso de hashing por fila: de él salen tanto el conteo
+    # (keep=False) como la primera aparición
+    es_dup, primera = _marcas_duplicados(df)
+    dups_before = int(es_dup.sum())
     if dups_before > 0:
         rows_before = len(df)
-        df = df.drop_duplicates(keep="first").reset_index(drop=True)
+        df = df[primera].reset_index(drop=True)
         rows_after = len(df)
         stats_global["deduplicacion"] = {
             "rows_before": rows_before,
             "rows_after": rows_after,
             "dropped_exact_dups": rows_before - rows_after,
-            "dups_after": int(df.duplicated(keep=False).sum()),
+            # Tras quedarse con la primera aparición ya no hay duplicados
+            "dups_after": 0,
         }
     else:
         stats_global["deduplicacion"] = {
@@ -218,9 +417,36 @@ def run_eda_for_upload(
         }
 
     stats_global["shape_final"] = df.shape
-    stats_global["mem_mb_final"] = round(
-        df.memory_usage(deep=True).sum() / (1024**2), 2
-    )
+
+    # Resumen de nulos del lote final: se calcula una vez aquí (el resultado
+    # del EDA se cachea) y el dashboard solo lo pinta
+    nulos_por_col = df.isna().sum().sort_values(ascending=False)
+    stats_global["calidad_final"] = {
+        "n_celdas_vacias": int(nulos_por_col.sum()),
+        "n_columnas_vacias": int(nulos_por_col.eq(len(df)).sum()),
+        "nulos_por_columna": nulos_por_col.to_dict(),
+    }
+    # Tipos mínimos (sin pérdida) para el resto del dashboard: filtros,
+    # conteos, concat. Incluye el número de día (1..7) en un entero de 8 bits
+    mem_antes = _mem_bytes(df)
+    categoricas = {
+        col: _TIPOS_PLANOS.get(col, tipos_entrada.get(col))
+        for col in df.columns
+        if isinstance(df[col].dtype, pd.CategoricalDtype)
+    }
+    df = _shrink_dtypes(df)
+    df.attrs["dtypes_originales"] = {
+        **{
+            col: t
+            for col, t in categoricas.items()
+            if t is not None and not isinstance(t, pd.CategoricalDtype)
+        },
+        **df.attrs.get("dtypes_originales", {}),
+    }
+    mem_final = _mem_bytes(df)
+    stats_global["mem_mb_final"] = round(mem_final / (1024**2), 2)
+    # MB ahorrados por la reducción de tipos
+    stats_global["mem_mb_shrunk"] = round((mem_antes - mem_final) / (1024**2), 2)
 
     return df, stats_global
 
@@ -234,31 +460,157 @@ def append_to_base_csv(
     new_clean_df: pd.DataFrame,
     base_clean_csv_path: str,
     output_path: Optional[str] = None,
+    id_cols: Optional[Sequence[str]] = None,
 ) -> Dict:
     """
     Toma un df ya procesado por run_eda_for_upload y lo agrega a la base limpia.
     Si output_path es None, sobreescribe base_clean_csv_path.
+    Las rutas pueden ser .csv o .parquet (se detecta por la extensión).
+    Con id_cols, las filas de la base cuyo id aparece en el df nuevo se
+    reemplazan por las nuevas (equivale a keep="last"). Sin id_cols y con la
+    misma ruta de salida, a un CSV solo se le agregan las filas al final.
 
     Retorna un dict con conteos:
       - n_before
       - n_new
+      - n_replaced
       - n_total
     """
-    base_df = robust_read_csv(base_clean_csv_path)
-    n_before = len(base_df)
+    new_clean_df = restore_original_dtypes(new_clean_df)
+    out_path = Path(output_path or base_clean_csv_path)
+    if not out_path.parent.is_dir():
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    new_ids = None
+    if id_cols:
+        id_cols = list(id_cols)
+        new_clean_df = new_clean_df.drop_duplicates(subset=id_cols, keep="last")
+        new_ids = pd.MultiIndex.from_frame(new_clean_df[id_cols])
     n_new = len(new_clean_df)
 
-    combined = pd.concat([base_df, new_clean_df], ignore_index=True)
-    n_total = len(combined)
+    # Parquet -> Parquet: se copia la base por lotes sin cargarla completa
+    counts = None
+    if _is_parquet(base_clean_csv_path) and _is_parquet(out_path):
+        counts = _append_parquet_streaming(
+            new_clean_df, str(base_clean_csv_path), out_path, id_cols, new_ids
+        )
 
-    out_path = Path(output_path or base_clean_csv_path)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    combined.to_csv(out_path, index=False)
+    # CSV sobre sí mismo sin ids: las filas nuevas se agregan al final del
+    # archivo sin leer ni reescribir la base
+    elif (
+        new_ids is None
+        and not _is_parquet(base_clean_csv_path)
+        and not _is_parquet(out_path)
+        and out_path.resolve() == Path(base_clean_csv_path).resolve()
+    ):
+        counts = _append_csv_inplace(new_clean_df, str(base_clean_csv_path))
+
+    if counts is None:
+        base_df = read_table_file(base_clean_csv_path)
+        n_before = len(base_df)
+        if new_clean_df.columns.symmetric_difference(base_df.columns).empty:
+            # Mismo esquema (lo normal): mismo orden de columnas que la base
+            # para que concat no tenga que alinear contra la unión
+            new_clean_df = new_clean_df[base_df.columns]
+        if new_ids is not None:
+            # Anti-join: un solo hash sobre los ids nuevos y un sondeo de la base
+            keep = ~pd.MultiIndex.from_frame(base_df[id_cols]).isin(new_ids)
+            base_df = base_df[keep]
+        n_kept = len(base_df)
+        combined = pd.concat([base_df, new_clean_df], ignore_index=True)
+        write_table_file(combined, str(out_path))
+    else:
+        n_before, n_kept = counts
 
     return {
         "base_path": str(base_clean_csv_path),
         "output_path": str(out_path),
         "n_before": n_before,
         "n_new": n_new,
-        "n_total": n_total,
+        "n_replaced": n_before - n_kept,
+        "n_total": n_kept + n_new,
     }
+
+
+def _is_parquet(path) -> bool:
+    return str(path).lower().endswith(".parquet")
+
+
+def _append_parquet_streaming(
+    new_clean_df: pd.DataFrame,
+    base_path: str,
+    out_path: Path,
+    id_cols: Optional[Sequence[str]] = None,
+    new_ids: Optional[pd.MultiIndex] = None,
+    batch_size: int = 100_000,
+) -> Optional[Tuple[int, int]]:
+    """
+    Copia la base Parquet lote a lote a un archivo temporal, agrega las filas
+    nuevas al final y reemplaza out_path. La memoria pico es de un lote, no
+    de la base completa.
+
+    Las filas de la base cuyo id está en new_ids se omiten al copiar.
+
+    Devuelve (filas de la base, filas conservadas), o None si las columnas del df nuevo no
+    encajan con el esquema de la base (el llamador usa entonces concat).
+    """
+    pqf = pq.ParquetFile(base_path)
+    schema = pqf.schema_arrow
+    if set(new_clean_df.columns) != set(schema.names):
+        return None
+    try:
+        new_table = pa.Table.from_pandas(
+            new_clean_df, schema=schema, preserve_index=False
+        )
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    n_before = n_kept = 0
+    with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+        for batch in pqf.iter_batches(batch_size=batch_size):
+            n_before += batch.num_rows
+            if new_ids is not None:
+                ids = pd.MultiIndex.from_frame(batch.select(id_cols).to_pandas())
+                batch = batch.filter(pa.array(~ids.isin(new_ids)))
+            n_kept += batch.num_rows
+            writer.write_batch(batch)
+        writer.write_table(new_table)
+    tmp_path.replace(out_path)
+    return n_before, n_kept
+
+
+def _append_csv_inplace(
+    new_clean_df: pd.DataFrame, base_path: str
+) -> Optional[Tuple[int, int]]:
+    """
+    Agrega las filas nuevas al final de un CSV en UTF-8 (modo "a"). De la
+    base solo se leen el encabezado y su primera columna, para el conteo.
+
+    Devuelve (filas de la base, filas conservadas), o None si el archivo no
+    encaja (otras columnas, otro encoding o vacío) y hay que reescribirlo.
+    """
+    try:
+        header = pd.read_csv(base_path, nrows=0, encoding="utf-8").columns
+        if set(header) != set(new_clean_df.columns) or header.has_duplicates:
+            return None
+        primera = pd.read_csv(
+            base_path, usecols=[0], encoding="utf-8", engine="pyarrow"
+        )
+    except (UnicodeDecodeError, ValueError, pd.errors.ParserError):
+        return None
+    if _has_binary_columns(primera):
+        return None
+    n_before = len(primera)
+
+    # Si la última línea no termina en salto, la primera fila nueva se
+    # pegaría a ella
+    with open(base_path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        sin_salto = f.read(1) != b"\n"
+    with open(base_path, "a", encoding="utf-8", newline="") as f:
+        if sin_salto:
+            f.write("\n")
+        # Mismo orden de columnas que el encabezado existente
+        new_clean_df[list(header)].to_csv(f, header=False, index=False)
+    return n_before, n_before
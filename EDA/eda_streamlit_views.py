@@ -1,24 +1,21 @@
 # EDA/eda_streamlit_views.py
 # Dashboard EDA incremental – vistas en Streamlit
 
-from typing import Dict
+from typing import Dict, Tuple
 
+import numpy as np
 import pandas as pd
 import streamlit as st
-import plotly.express as px
+from plotly.colors import qualitative
 
 # ===================================================
 # 1. Estilo visual (sin alterar el tema global)
 # ===================================================
 
 
-def inject_dashboard_css():
-    """
-    Estilo para tarjetas KPI y tablas.
-    No tocamos el fondo global de la app (usamos el tema oscuro de Streamlit).
-    """
-    st.markdown(
-        """
+# Estilo y plantilla de tarjeta como constantes del módulo: no se vuelven a
+# construir en cada rerun
+_DASHBOARD_CSS = """
         <style>
         .metric-card {
             padding: 0.75rem 1rem;
@@ -54,20 +51,30 @@ def inject_dashboard_css():
             overflow: hidden;
         }
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+"""
 
-
-def metric_card(title: str, value: str, subtitle: str = ""):
-    st.markdown(
-        f"""
+_METRIC_CARD_HTML = """
         <div class="metric-card">
           <div class="metric-label">{title}</div>
           <div class="metric-value">{value}</div>
           <div class="metric-sub">{subtitle}</div>
         </div>
-        """,
+"""
+
+
+def inject_dashboard_css():
+    """
+    Estilo para tarjetas KPI y tablas.
+    No tocamos el fondo global de la app (usamos el tema oscuro de Streamlit).
+    Se pinta en cada rerun (si se omite, Streamlit quita el estilo de la
+    página); st.html con solo <style> no ocupa espacio en el layout.
+    """
+    st.html(_DASHBOARD_CSS)
+
+
+def metric_card(title: str, value: str, subtitle: str = ""):
+    st.markdown(
+        _METRIC_CARD_HTML.format(title=title, value=value, subtitle=subtitle),
         unsafe_allow_html=True,
     )
 
@@ -96,45 +103,28 @@ def pretty_col(col: str) -> str:
 # ===================================================
 
 
-def _kpi_calidad_datos(df: pd.DataFrame, stats: Dict):
+@st.cache_data(show_spinner=False, max_entries=16)
+def _resumen_calidad(eda_key: tuple, _df: pd.DataFrame, _stats: Dict) -> Dict:
     """
-    KPIs de calidad de datos + tabla de columnas con más nulos.
+    Nulos por columna, conteos para los KPIs y la tabla de faltantes, una
+    vez por lote. Se parte del resumen que deja el pipeline en stats; si no
+    viene, se calcula con una sola pasada de isna().
     """
-    n_rows, n_cols = df.shape
-    total_cells = n_rows * n_cols
-    n_missing_cells = int(df.isna().sum().sum())
-    pct_missing = (n_missing_cells / total_cells * 100) if total_cells else 0
-
-    empty_cols_mask = df.isna().all()
-    n_empty_cols = int(empty_cols_mask.sum())
-
-    missing_by_col = df.isna().sum().sort_values(ascending=False)
-    top_col = missing_by_col.index[0] if not missing_by_col.empty else "N/D"
-    top_col_n = int(missing_by_col.iloc[0]) if not missing_by_col.empty else 0
-
-    c1, c2, c3, c4 = st.columns(4)
-    with c1:
-        metric_card("Nuevos registros", f"{n_rows:,}", f"{n_cols} columnas")
-    with c2:
-        metric_card(
-            "Celdas vacías", f"{n_missing_cells:,}", f"{pct_missing:.2f}% del lote"
-        )
-    with c3:
-        metric_card("Columnas vacías", f"{n_empty_cols:,}", "Todas las filas son nulas")
-    with c4:
-        metric_card(
-            "Variable con más valores faltantes",
-            pretty_col(top_col),
-            f"{top_col_n:,} valores nulos",
-        )
-
-    # --- Tabla de columnas con más nulos ---
+    n_rows = len(_df)
+    calidad = _stats.get("calidad_final")
+    if calidad is not None:
+        missing_by_col = pd.Series(calidad["nulos_por_columna"], dtype="int64")
+        n_missing_cells = calidad["n_celdas_vacias"]
+        n_empty_cols = calidad["n_columnas_vacias"]
+    else:
+        missing_by_col = _df.isna().sum().sort_values(ascending=False)
+        n_missing_cells = int(missing_by_col.sum())
+        n_empty_cols = int(missing_by_col.eq(n_rows).sum())
 
-    missing_df = stats.get("missing_top20", None)
+    missing_df = _stats.get("missing_top20", None)
 
     if isinstance(missing_df, pd.DataFrame) and not missing_df.empty:
-        tabla = missing_df.copy()
-        tabla = tabla.reset_index()
+        tabla = missing_df.reset_index()
         col_names = list(tabla.columns)
 
         rename_map = {}
@@ -147,20 +137,54 @@ def _kpi_calidad_datos(df: pd.DataFrame, stats: Dict):
 
         tabla = tabla.rename(columns=rename_map)
     else:
-        tabla = (
-            df.isna()
-            .sum()
-            .rename("n_nulos")
-            .to_frame()
-            .sort_values("n_nulos", ascending=False)
-        )
+        tabla = missing_by_col.rename("n_nulos").to_frame()
         tabla["porcentaje"] = (tabla["n_nulos"] / max(n_rows, 1) * 100).round(2)
         tabla = tabla.reset_index().rename(columns={"index": "columna"})
 
-    tabla["columna"] = tabla["columna"].astype(str).map(pretty_col)
+    # Misma regla que pretty_col, con operaciones vectorizadas
+    nombres = tabla["columna"].astype(str)
+    tabla["columna"] = nombres.map(PRETTY_LABELS).fillna(
+        nombres.str.replace("_", " ", regex=False).str.capitalize()
+    )
+
+    return {
+        "n_celdas_vacias": n_missing_cells,
+        "n_columnas_vacias": n_empty_cols,
+        "top_col": missing_by_col.index[0] if not missing_by_col.empty else "N/D",
+        "top_col_n": int(missing_by_col.iloc[0]) if not missing_by_col.empty else 0,
+        "tabla": tabla.head(15),
+    }
+
 
+def _kpi_calidad_datos(df: pd.DataFrame, stats: Dict, eda_key: tuple):
+    """
+    KPIs de calidad de datos + tabla de columnas con más nulos.
+    """
+    n_rows, n_cols = df.shape
+    total_cells = n_rows * n_cols
+
+    resumen = _resumen_calidad(eda_key, df, stats)
+    n_missing_cells = resumen["n_celdas_vacias"]
+    n_empty_cols = resumen["n_columnas_vacias"]
+    pct_missing = (n_missing_cells / total_cells * 100) if total_cells else 0
+
+    cards = (
+        ("Nuevos registros", f"{n_rows:,}", f"{n_cols} columnas"),
+        ("Celdas vacías", f"{n_missing_cells:,}", f"{pct_missing:.2f}% del lote"),
+        ("Columnas vacías", f"{n_empty_cols:,}", "Todas las filas son nulas"),
+        (
+            "Variable con más valores faltantes",
+            pretty_col(resumen["top_col"]),
+            f"{resumen['top_col_n']:,} valores nulos",
+        ),
+    )
+    for col, (title, value, subtitle) in zip(st.columns(4), cards):
+        with col:
+            metric_card(title, value, subtitle)
+
+    # --- Tabla de columnas con más nulos ---
     st.markdown("**Columnas con mayor cantidad de valores faltantes (lote nuevo)**")
-    st.dataframe(tabla.head(15), use_container_width=True)
+    st.dataframe(resumen["tabla"], use_container_width=True)
 
 
 # ===================================================
@@ -168,74 +192,116 @@ def _kpi_calidad_datos(df: pd.DataFrame, stats: Dict):
 # ===================================================
 
 
-def _aplicar_filtros(df: pd.DataFrame) -> pd.DataFrame:
+@st.cache_data(show_spinner=False, max_entries=32)
+def _opciones(eda_key: tuple, col: str, _df: pd.DataFrame) -> list:
+    """Valores distintos de `col` para los filtros (una vez por lote)."""
+    s = _df[col]
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # Las categorías ya son los distintos: solo se descartan las que no
+        # aparecen en el lote, a partir de los códigos
+        codes = s.cat.codes.to_numpy()
+        presentes = np.bincount(codes[codes >= 0], minlength=len(s.cat.categories)) > 0
+        return sorted(s.cat.categories[presentes].tolist())
+    return sorted(s.dropna().unique().tolist())
+
+
+def _aplicar_filtros(df: pd.DataFrame, eda_key: tuple) -> Tuple[pd.DataFrame, tuple]:
     """
     Filtros por alcaldía, macrogrupo y región.
+    Devuelve el df filtrado y la clave de caché (lote + selección).
     """
+    # Sin selección = sin filtro: el widget no arrastra la lista completa
+    # como valor por defecto en cada rerun
     with st.expander("Filtros del dashboard", expanded=False):
         col1, col2, col3 = st.columns(3)
 
         if "alcaldia_hecho" in df.columns:
-            alc_opts = sorted(df["alcaldia_hecho"].dropna().unique().tolist())
+            alc_opts = _opciones(eda_key, "alcaldia_hecho", df)
             sel_alc = col1.multiselect(
                 "Alcaldía de ocurrencia",
                 options=alc_opts,
-                default=alc_opts,
+                default=None,
+                placeholder="Todas",
             )
         else:
             sel_alc = None
 
         if "delito_grupo_macro" in df.columns:
-            macro_opts = sorted(df["delito_grupo_macro"].dropna().unique().tolist())
+            macro_opts = _opciones(eda_key, "delito_grupo_macro", df)
             sel_macro = col2.multiselect(
                 "Macrogrupo de delito",
                 options=macro_opts,
-                default=macro_opts,
+                default=None,
+                placeholder="Todos",
             )
         else:
             sel_macro = None
 
         if "region_cdmx" in df.columns:
-            reg_opts = sorted(df["region_cdmx"].dropna().unique().tolist())
+            reg_opts = _opciones(eda_key, "region_cdmx", df)
             sel_reg = col3.multiselect(
                 "Región de la Ciudad de México",
                 options=reg_opts,
-                default=reg_opts,
+                default=None,
+                placeholder="Todas",
             )
         else:
             sel_reg = None
 
-    df_f = df.copy()
+    # Una sola máscara combinada y un solo filtrado; las gráficas solo leen
+    # el resultado, así que no hace falta copiar el df
+    mascaras = []
     if sel_alc:
-        df_f = df_f[df_f["alcaldia_hecho"].isin(sel_alc)]
+        mascaras.append(df["alcaldia_hecho"].isin(sel_alc).to_numpy())
     if sel_macro:
-        df_f = df_f[df_f["delito_grupo_macro"].isin(sel_macro)]
+        mascaras.append(df["delito_grupo_macro"].isin(sel_macro).to_numpy())
     if sel_reg:
-        df_f = df_f[df_f["region_cdmx"].isin(sel_reg)]
+        mascaras.append(df["region_cdmx"].isin(sel_reg).to_numpy())
 
-    return df_f
+    clave = (
+        eda_key,
+        tuple(sel_alc or ()),
+        tuple(sel_macro or ()),
+        tuple(sel_reg or ()),
+    )
+    if not mascaras:
+        return df, clave
+    return df[np.logical_and.reduce(mascaras)], clave
 
 
 # ===================================================
 # 5. Gráficas con Plotly
 # ===================================================
 
-COLOR_SEQ = px.colors.qualitative.Set2  # paleta neutra pero viva
+COLOR_SEQ = qualitative.Set2  # paleta neutra pero viva
 
+# plotly.express (y todo lo que arrastra) se importa dentro de cada gráfica:
+# KPIs y filtros se pintan sin esperar esa carga
 
-def _grafica_macrogrupo(df: pd.DataFrame):
+
+# Agregados cacheados por (lote, filtros): un rerun que no cambia los filtros
+# (p. ej. mover otro widget) no vuelve a recorrer el df
+@st.cache_data(show_spinner=False, max_entries=64)
+def _conteos(clave: tuple, col: str, dropna: bool, _df: pd.DataFrame) -> pd.Series:
+    vc = _df[col].value_counts(dropna=dropna)
+    # Las columnas categóricas cuentan también las categorías sin filas
+    return vc[vc > 0]
+
+
+def _grafica_macrogrupo(df: pd.DataFrame, clave: tuple):
     if "delito_grupo_macro" not in df.columns:
         st.info("No se encontró la variable de macrogrupo de delito.")
         return
 
     counts = (
-        df["delito_grupo_macro"]
-        .value_counts()
+        _conteos(clave, "delito_grupo_macro", True, df)
         .sort_values(ascending=False)
         .reset_index()
     )
     counts.columns = ["Macrogrupo de delito", "Incidentes"]
 
+    import plotly.express as px
+
     fig = px.bar(
         counts,
         x="Macrogrupo de delito",
@@ -256,14 +322,16 @@ def _grafica_macrogrupo(df: pd.DataFrame):
     st.plotly_chart(fig, use_container_width=True)
 
 
-def _grafica_region(df: pd.DataFrame):
+def _grafica_region(df: pd.DataFrame, clave: tuple):
     if "region_cdmx" not in df.columns:
         st.info("No se encontró la variable de región de la Ciudad de México.")
         return
 
-    counts = df["region_cdmx"].value_counts().reset_index()
+    counts = _conteos(clave, "region_cdmx", True, df).reset_index()
     counts.columns = ["Región de la Ciudad de México", "Incidentes"]
 
+    import plotly.express as px
+
     fig = px.pie(
         counts,
         names="Región de la Ciudad de México",
@@ -281,15 +349,34 @@ def _grafica_region(df: pd.DataFrame):
     st.plotly_chart(fig, use_container_width=True)
 
 
-def _grafica_categorica_dinamica(df: pd.DataFrame):
+@st.cache_data(show_spinner=False, max_entries=32)
+def _nunique_categoricas(clave: tuple, _df: pd.DataFrame) -> Dict[str, int]:
+    """
+    Número de valores distintos (sin nulos) de las columnas de texto/categóricas.
+    En las categóricas se cuentan solo las categorías presentes, vía los códigos.
+    """
+    meta = {}
+    for col in _df.select_dtypes(include=["object", "string", "category"]).columns:
+        s = _df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes = s.cat.codes.to_numpy()
+            presentes = np.bincount(codes[codes >= 0], minlength=len(s.cat.categories))
+            meta[col] = int(np.count_nonzero(presentes))
+        else:
+            meta[col] = int(s.nunique(dropna=True))
+    return meta
+
+
+@st.fragment
+def _grafica_categorica_dinamica(df: pd.DataFrame, clave: tuple):
+    """
+    Fragmento: cambiar la variable o el Top N solo vuelve a pintar esta
+    gráfica, sin repetir KPIs, filtros ni las otras gráficas.
+    """
     st.markdown("**Distribución por variable categórica (configurable)**")
 
-    candidates = []
-    for col in df.columns:
-        if pd.api.types.is_string_dtype(df[col]) or df[col].dtype == "object":
-            nunique = df[col].nunique(dropna=True)
-            if 2 <= nunique <= 40:
-                candidates.append(col)
+    meta = _nunique_categoricas(clave, df)
+    candidates = [col for col, n in meta.items() if 2 <= n <= 40]
 
     if not candidates:
         st.info("No se encontraron variables categóricas adecuadas para graficar.")
@@ -304,12 +391,14 @@ def _grafica_categorica_dinamica(df: pd.DataFrame):
         "Número máximo de categorías (Top N)",
         3,
         30,
-        min(10, df[col_sel].nunique(dropna=True)),
+        min(10, meta[col_sel]),
     )
 
-    vc = df[col_sel].value_counts(dropna=False).head(top_n).reset_index()
+    vc = _conteos(clave, col_sel, False, df).head(top_n).reset_index()
     vc.columns = [pretty_col(col_sel), "Incidentes"]
 
+    import plotly.express as px
+
     fig = px.bar(
         vc,
         x=pretty_col(col_sel),
@@ -330,18 +419,39 @@ def _grafica_categorica_dinamica(df: pd.DataFrame):
     st.plotly_chart(fig, use_container_width=True)
 
 
-def _grafica_temporal(df: pd.DataFrame):
+@st.cache_data(show_spinner=False, max_entries=32)
+def _fechas_validas(clave: tuple, _df: pd.DataFrame) -> pd.DatetimeIndex:
+    # Solo la columna de fecha: no hace falta copiar todo el df.
+    # Índice ordenado para poder usar resample sobre el int64 subyacente
+    fechas = pd.to_datetime(_df["fecha_hecho"], errors="coerce").dropna()
+    return pd.DatetimeIndex(fechas).sort_values()
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _conteo_temporal(clave: tuple, modo: str, _fechas: pd.DatetimeIndex) -> pd.Series:
+    """Incidentes por día, por mes o por día de la semana (0 = lunes)."""
+    if modo == "Día de la semana":
+        return pd.Series(np.bincount(_fechas.dayofweek, minlength=7), name="Incidentes")
+    regla = "D" if modo == "Día" else "MS"
+    serie = pd.Series(1, index=_fechas).resample(regla).size()
+    # Igual que la agrupación original: solo periodos con incidentes
+    return serie[serie > 0].rename("Incidentes")
+
+
+@st.fragment
+def _grafica_temporal(df: pd.DataFrame, clave: tuple):
+    """
+    Fragmento: cambiar la agrupación temporal solo vuelve a pintar esta gráfica.
+    """
     if "fecha_hecho" not in df.columns:
         st.info("No se encontró la variable de fecha del incidente.")
         return
 
     st.markdown("**Serie temporal de incidentes**")
 
-    tmp = df.copy()
-    tmp["fecha_hecho"] = pd.to_datetime(tmp["fecha_hecho"], errors="coerce")
-    tmp = tmp.dropna(subset=["fecha_hecho"])
+    fechas = _fechas_validas(clave, df)
 
-    if tmp.empty:
+    if fechas.empty:
         st.info("No hay fechas válidas para construir la serie temporal.")
         return
 
@@ -351,13 +461,12 @@ def _grafica_temporal(df: pd.DataFrame):
         index=0,
     )
 
+    serie = _conteo_temporal(clave, modo, fechas)
+
+    import plotly.express as px
+
     if modo == "Día":
-        serie = (
-            tmp.groupby(tmp["fecha_hecho"].dt.date)
-            .size()
-            .rename("Incidentes")
-            .reset_index()
-        )
+        serie = serie.reset_index()
         serie.columns = ["Fecha del incidente", "Incidentes"]
 
         fig = px.line(
@@ -377,14 +486,8 @@ def _grafica_temporal(df: pd.DataFrame):
         st.plotly_chart(fig, use_container_width=True)
 
     elif modo == "Mes":
-        serie = (
-            tmp.groupby(tmp["fecha_hecho"].dt.to_period("M"))
-            .size()
-            .rename("Incidentes")
-            .reset_index()
-        )
-        serie["Mes"] = serie["fecha_hecho"].dt.to_timestamp()
-        serie = serie.drop(columns=["fecha_hecho"])
+        serie = serie.reset_index()
+        serie.columns = ["Mes", "Incidentes"]
 
         fig = px.line(
             serie,
@@ -412,13 +515,7 @@ def _grafica_temporal(df: pd.DataFrame):
             5: "Sábado",
             6: "Domingo",
         }
-        serie = (
-            tmp.groupby(tmp["fecha_hecho"].dt.dayofweek)
-            .size()
-            .rename("Incidentes")
-            .reindex(range(7), fill_value=0)
-            .reset_index()
-        )
+        serie = serie.reset_index()
         serie["index"] = serie["index"].map(mapa)
         serie.columns = ["Día de la semana", "Incidentes"]
 
@@ -448,22 +545,24 @@ def _grafica_temporal(df: pd.DataFrame):
 
 def render_eda_dashboard(
     nuevos_clean: pd.DataFrame,
-    combined: pd.DataFrame,
     stats: Dict,
+    eda_key: tuple,
 ):
     """
     Dashboard principal para el lote nuevo.
     Se pinta entre “Acciones rápidas” y “Vistas detalladas”.
+    `eda_key` identifica el lote (la misma clave con la que se cacheó el EDA)
+    y sirve de llave para los agregados de las gráficas.
     """
     inject_dashboard_css()
 
     st.subheader("3) Exploración del lote nuevo (dashboard)")
 
     # KPIs de calidad de datos
-    _kpi_calidad_datos(nuevos_clean, stats)
+    _kpi_calidad_datos(nuevos_clean, stats, eda_key)
 
     # Filtros
-    df_f = _aplicar_filtros(nuevos_clean)
+    df_f, clave = _aplicar_filtros(nuevos_clean, eda_key)
     st.caption(
         f"Registros considerados en las gráficas: {len(df_f):,} "
         f"de {len(nuevos_clean):,} registros del lote nuevo."
@@ -474,14 +573,14 @@ def render_eda_dashboard(
     # Layout tipo BI: 2 gráficas arriba, 2 abajo
     col_top_left, col_top_right = st.columns([2, 1.6])
     with col_top_left:
-        _grafica_macrogrupo(df_f)
+        _grafica_macrogrupo(df_f, clave)
     with col_top_right:
-        _grafica_region(df_f)
+        _grafica_region(df_f, clave)
 
     st.markdown("---")
 
     col_bottom_left, col_bottom_right = st.columns(2)
     with col_bottom_left:
-        _grafica_categorica_dinamica(df_f)
+        _grafica_categorica_dinamica(df_f, clave)
     with col_bottom_right:
-        _grafica_temporal(df_f)
+        _grafica_temporal(df_f, clave)
@@ -2,12 +2,16 @@
 # Carga patrones desde regex_config.jam y aplica clasificación.
 # Aquí NO hay patrones quemados: solo funciones + diccionarios de lógica.
 
+import os
 import re
+from functools import lru_cache
 from typing import Tuple, Dict, Optional
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 
-from .update_base import norm_series
+from .update_base import ascii_arrow_text, norm_series, regex_contains
 
 
 # ------------------------------------------------------------
@@ -47,6 +51,24 @@ def load_regex_config(path: str) -> Dict[str, re.Pattern]:
     return patterns
 
 
+@lru_cache(maxsize=4)
+def _load_regex_config_cached(path: str, mtime: float) -> Dict[str, re.Pattern]:
+    return load_regex_config(path)
+
+
+def get_regex_config(path: str) -> Dict[str, re.Pattern]:
+    """
+    Igual que load_regex_config, pero compila los patrones una sola vez por
+    versión del archivo (la clave incluye su mtime, así que editar el .jam
+    invalida la caché). El dict devuelto es compartido: no modificarlo.
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return load_regex_config(path)  # lanza el FileNotFoundError descriptivo
+    return _load_regex_config_cached(path, mtime)
+
+
 # ------------------------------------------------------------
 # Orden de evaluación y lógica de grupos (no es regex)
 # ------------------------------------------------------------
@@ -155,19 +177,38 @@ MAP_VIOLENCIA = {
 # Helpers internos
 # ------------------------------------------------------------
 
+# Respaldo para patrones opcionales; se compila una vez al importar
+_PATRON_VACIO = re.compile("")
+
+# Todos los valores posibles de delito_grupo, en orden de precedencia
+_CATEGORIAS_GRUPO = list(
+    dict.fromkeys([ALIAS.get(k, k) for k in GROUP_ORDER] + ["OTRO"])
+)
+_GRUPO_DTYPE = pd.CategoricalDtype(categories=_CATEGORIAS_GRUPO)
+
 
 def _group_from_text(t: pd.Series, rgx: Dict[str, re.Pattern]) -> pd.Series:
     """
     Aplica precedencia de primer match usando GROUP_ORDER; por defecto OTRO.
+    Cada patrón se prueba solo contra los textos que aún no tienen grupo,
+    así que los grupos de baja prioridad recorren cada vez menos filas.
+    Con texto ASCII los patrones corren en el kernel RE2 de Arrow.
     """
-    out = pd.Series(pd.NA, index=t.index, dtype="string")
+    valores = np.full(len(t), None, dtype=object)
+    pendiente = t.notna().to_numpy(dtype=bool, copy=True)
+    arr = ascii_arrow_text(t)
     for key in GROUP_ORDER:
+        if not pendiente.any():
+            break
         if key not in rgx:
             continue
-        mask = t.str.contains(rgx[key], na=False)
-        out.loc[mask & out.isna()] = ALIAS.get(key, key)
-    out = out.where(t.isna(), out.fillna("OTRO"))
-    return out
+        pos = np.flatnonzero(pendiente)
+        sub = None if arr is None else arr.take(pa.array(pos))
+        hit = regex_contains(t.iloc[pos], rgx[key], sub)
+        valores[pos[hit]] = ALIAS.get(key, key)
+        pendiente[pos[hit]] = False
+    valores[pendiente] = "OTRO"
+    return pd.Series(valores, index=t.index, dtype="string")
 
 
 # ------------------------------------------------------------
@@ -182,6 +223,7 @@ def classify_regex(
     violencia_col: str = "clase_violencia",
     pasajero_col: str = "robo_pasajero",
     regex_config_path: Optional[str] = "regex_config.jam",
+    inplace: bool = False,
 ) -> Tuple[pd.DataFrame, dict]:
     """
     Usa patrones de regex_config.jam para estandarizar delitos:
@@ -194,61 +236,85 @@ def classify_regex(
     if regex_config_path is None:
         raise ValueError("Debes indicar la ruta de regex_config.jam")
 
-    rgx = load_regex_config(regex_config_path)
+    rgx = get_regex_config(regex_config_path)
 
     # Aseguramos que los grupos clave existan
     missing_keys = [k for k in GROUP_ORDER if k not in rgx]
     if missing_keys:
         raise KeyError(f"Faltan patrones en regex_config.jam para: {missing_keys}")
 
-    out = df.copy()
+    out = df if inplace else df.copy()
 
-    t = (
-        norm_series(out[delito_col])
-        if delito_col in out.columns
-        else pd.Series("", index=out.index, dtype="string")
-    )
+    # Los textos de delito se repiten muchísimo: se normalizan y clasifican
+    # solo los valores únicos y el resultado se expande con los códigos de
+    # factorize. Los nulos entran como un valor más, así que el resultado es
+    # idéntico a procesar fila por fila.
+    if delito_col in out.columns:
+        codes, uniques = pd.factorize(out[delito_col], use_na_sentinel=False)
+        t = norm_series(pd.Series(uniques, dtype="object"))
+    else:
+        codes = np.zeros(len(out), dtype=np.intp)
+        t = pd.Series([""], dtype="string")
 
     grp = _group_from_text(t, rgx)
 
-    # Forzar algunos OTRO a grupos más informativos usando contexto
-    # Para vehículo usamos el mismo patrón de ROBO_VEHICULO
-    veh_pat = rgx.get("ROBO_VEHICULO", re.compile(""))
-
-    grp.loc[(grp.isna() | (grp == "OTRO")) & t.str.contains(veh_pat, na=False)] = (
-        "ROBO_VEHICULO"
+    pasajero_pat = rgx.get("ROBO_PASAJERO", _PATRON_VACIO)
+    pasajero = regex_contains(t, pasajero_pat, ascii_arrow_text(t))
+
+    # Grupo, macrogrupo y violencia como códigos sobre categorías fijas:
+    # GROUP_TO_MACRO y MAP_VIOLENCIA se consultan una vez por categoría
+    # (no por texto ni por fila) y cada columna final es un solo gather de
+    # los códigos. Las tablas llevan una posición extra al final para los
+    # textos nulos, a la que apunta el código -1.
+    grp_codes = pd.Categorical(grp, categories=_CATEGORIAS_GRUPO).codes
+    macro_tab = pd.Categorical(
+        [GROUP_TO_MACRO.get(g, "NO_DELITO_OTROS") for g in _CATEGORIAS_GRUPO]
+        + ["NO_DELITO_OTROS"]
     )
-
-    obj_pat = rgx.get("ROBO_OBJETOS", re.compile(""))
-    grp.loc[(grp.isna() | (grp == "OTRO")) & t.str.contains(obj_pat, na=False)] = (
-        "ROBO_OBJETOS"
+    violencia_tab = pd.Categorical(
+        [MAP_VIOLENCIA.get(g) for g in _CATEGORIAS_GRUPO] + [None]
     )
+    macro_codes = macro_tab.codes[grp_codes]
+    violencia_codes = violencia_tab.codes[grp_codes]
 
-    out[grupo_col] = grp.astype("string")
+    def _expand(valores_codes: np.ndarray, dtype: pd.CategoricalDtype) -> pd.Series:
+        return pd.Series(
+            pd.Categorical.from_codes(valores_codes[codes], dtype=dtype),
+            index=out.index,
+        )
 
-    out["delito_grupo_macro"] = (
-        out[grupo_col].map(GROUP_TO_MACRO).fillna("NO_DELITO_OTROS").astype("string")
+    out[grupo_col] = _expand(grp_codes, _GRUPO_DTYPE)
+    out["delito_grupo_macro"] = _expand(macro_codes, macro_tab.dtype)
+    out[violencia_col] = _expand(violencia_codes, violencia_tab.dtype)
+
+    out[pasajero_col] = pd.array(pasajero.astype("int64")[codes], dtype="Int64")
+
+    # Estadísticas desde los valores únicos: bincount de los códigos da las
+    # filas de cada texto y basta sumarlas por macrogrupo (sin volver a
+    # hashear las columnas de N filas)
+    filas = np.bincount(codes, minlength=len(grp))
+    usados = filas > 0
+    # Las categorías del macrogrupo están en orden alfabético, como las
+    # llaves de un groupby; el sort estable conserva ese orden en empates
+    por_macro = np.bincount(
+        macro_codes[usados], weights=filas[usados], minlength=len(macro_tab.categories)
+    ).astype("int64")
+    conteos_macro = (
+        pd.Series(por_macro, index=macro_tab.categories.astype(object))
+        .loc[lambda c: c > 0]
+        .sort_values(ascending=False, kind="stable")
     )
 
-    out[violencia_col] = out[grupo_col].map(MAP_VIOLENCIA).astype("string")
-
-    pasajero_pat = rgx.get("ROBO_PASAJERO", re.compile(""))
-    out[pasajero_col] = t.str.contains(pasajero_pat, na=False).astype("Int64")
-
     stats = {
-        "n_grupos_despues": int(out[grupo_col].nunique(dropna=False)),
-        "n_grupos_macro_despues": int(out["delito_grupo_macro"].nunique(dropna=False)),
-        "n_clases_violencia": int(out[violencia_col].nunique(dropna=False)),
-        "n_robo_pasajero_1": int(out[pasajero_col].fillna(0).eq(1).sum()),
-        "conteos_macrogrupo": (
-            out["delito_grupo_macro"].value_counts(dropna=False).to_dict()
-        ),
+        "n_grupos_despues": int(grp[usados].nunique(dropna=False)),
+        "n_grupos_macro_despues": len(conteos_macro),
+        "n_clases_violencia": len(np.unique(violencia_codes[usados])),
+        "n_robo_pasajero_1": int(filas[pasajero].sum()),
+        "conteos_macrogrupo": conteos_macro.to_dict(),
         "porcentaje_macrogrupo": (
-            out["delito_grupo_macro"]
-            .value_counts(normalize=True, dropna=False)
-            .mul(100)
-            .round(2)
-            .to_dict()
+            conteos_macro.div(len(out)).mul(100).round(2).to_dict()
+            if len(out)
+            else {}
         ),
         "total_registros": len(out),
     }
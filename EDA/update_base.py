@@ -1,12 +1,18 @@
 # update_base.py
 # Utilidades generales para el EDA (IO, fechas, clima, regiones, etc.)
+# Los pasos que transforman el df devuelven una copia por defecto; con
+# inplace=True escriben sobre el df recibido. El pipeline les pasa una copia
+# superficial del lote, así que con inplace=True solo se reemplazan o agregan
+# columnas completas (df[col] = ...), nunca .loc/.iloc sobre las existentes.
 
 import re
-import unicodedata
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
 
 # ------------------------------------------------------------
@@ -26,14 +32,55 @@ def robust_read_csv(
         kwargs = {k: v for k, v in kwargs.items() if k != "encoding"}
 
     for enc in try_encodings:
-        try:
-            return pd.read_csv(path, encoding=enc, **kwargs)
-        except Exception as e:
-            last_err = e
+        # Primero el parser multihilo de PyArrow; si rechaza el archivo o
+        # alguna opción de kwargs, el parser por defecto con el mismo encoding
+        for engine in ("pyarrow", None):
+            try:
+                df = pd.read_csv(path, encoding=enc, engine=engine, **kwargs)
+            except Exception as e:
+                last_err = e
+                continue
+            if engine == "pyarrow" and _has_binary_columns(df):
+                # PyArrow no falla con UTF-8 inválido: deja la columna en bytes
+                last_err = UnicodeDecodeError(enc, b"", 0, 1, "binary column")
+                continue
+            return df
 
     raise RuntimeError(f"Could not read {path}. Last error: {last_err}")
 
 
+def _has_binary_columns(df: pd.DataFrame) -> bool:
+    """True si alguna columna de texto quedó como bytes (encoding incorrecto)."""
+    for col in df.select_dtypes(include="object").columns:
+        idx = df[col].first_valid_index()
+        if idx is not None and isinstance(df[col].at[idx], bytes):
+            return True
+    return False
+
+
+def read_table_file(path: str, columns=None) -> pd.DataFrame:
+    """
+    Lee un .parquet (solo las `columns` pedidas, si se indican) o, para
+    cualquier otra extensión, un CSV con robust_read_csv.
+    """
+    if str(path).lower().endswith(".parquet"):
+        return pd.read_parquet(path, engine="pyarrow", columns=columns)
+    return robust_read_csv(path, usecols=columns)
+
+
+def write_table_file(df: pd.DataFrame, path: str) -> None:
+    """
+    Escribe según la extensión: .parquet con ZSTD (más chico y rápido de
+    releer) o CSV para cualquier otra.
+    """
+    if str(path).lower().endswith(".parquet"):
+        # Directo a pyarrow: to_parquet hace la misma conversión con más capas
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, str(path), compression="zstd")
+    else:
+        df.to_csv(path, index=False)
+
+
 def report_missing_values(df: pd.DataFrame) -> pd.DataFrame:
     """
     Tabla con NA absolutos y porcentaje, ordenada desc.
@@ -57,21 +104,73 @@ def report_duplicates_full(df: pd.DataFrame) -> Dict[str, int]:
 # ------------------------------------------------------------
 
 
-def _strip_accents(s: str) -> str:
-    return "".join(
-        ch
-        for ch in unicodedata.normalize("NFD", str(s))
-        if unicodedata.category(ch) != "Mn"
+def norm_series(s: pd.Series) -> pd.Series:
+    """
+    Mayúsculas, recorte, colapso de espacios, sin acentos; devuelve dtype 'string'.
+    """
+    # Toda la normalización es por valor: se hace una vez por valor distinto
+    # del texto crudo y se expande con los códigos de factorize (los nulos
+    # cuentan como un valor), así ningún paso recorre las N filas
+    codes, uniques = pd.factorize(s, use_na_sentinel=False)
+    u = (
+        pd.Series(uniques, dtype=object)
+        .astype("string")
+        .str.strip()
+        .str.replace(r"\s+", " ", regex=True)
+    )
+    # Acentos fuera con kernels de Arrow: NFD y borrar las marcas combinantes
+    # (categoría Unicode Mn). Los nulos se quedan como el texto "<NA>", que
+    # es lo que siempre ha producido esta normalización para ellos
+    arr = pa.array(u.fillna("<NA>"), type=pa.string())
+    sin_acentos = pc.replace_substring_regex(
+        pc.utf8_normalize(arr, form="NFD"), pattern=r"\p{Mn}", replacement=""
+    )
+    limpios = pd.Series(sin_acentos.to_pylist(), dtype="string").str.upper()
+    return pd.Series(
+        limpios.array.take(codes), index=s.index, name=s.name, dtype="string"
     )
 
 
-def norm_series(s: pd.Series) -> pd.Series:
+def ascii_arrow_text(s: pd.Series) -> Optional[pa.Array]:
     """
-    Mayúsculas, recorte, colapso de espacios, sin acentos; devuelve dtype 'string'.
+    `s` como arreglo string de Arrow si todo el texto es ASCII de una línea
+    (lo normal tras norm_series); None en otro caso. Solo con ese texto las
+    clases \\b, \\w, \\s y el $ de RE2 coinciden con las de `re`.
     """
-    s = s.astype("string").str.strip().str.replace(r"\s+", " ", regex=True)
-    s = s.map(_strip_accents).str.upper()
-    return s.astype("string")
+    try:
+        arr = pa.array(s, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+    if pc.all(pc.string_is_ascii(arr)).as_py() is False:
+        return None
+    if pc.any(pc.match_substring(arr, "\n")).as_py():
+        return None
+    return arr
+
+
+def regex_contains(
+    s: pd.Series, patron: re.Pattern, arr: Optional[pa.Array] = None
+) -> np.ndarray:
+    """
+    Máscara de s.str.contains(patron, na=False). Con `arr` (de
+    ascii_arrow_text) corre en el kernel RE2 de Arrow sobre el buffer UTF-8;
+    si no hay `arr`, el patrón lleva flags o RE2 no acepta su sintaxis, con re.
+    """
+    if arr is not None and patron.flags == re.UNICODE:
+        try:
+            hit = pc.match_substring_regex(arr, pattern=patron.pattern)
+            return hit.fill_null(False).to_numpy(zero_copy_only=False)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+    # Con re: el search ligado del patrón ya compilado, directo sobre los
+    # valores (lo que no es texto cuenta como False, igual que na=False)
+    search = patron.search
+    valores = s.to_numpy(dtype=object, na_value=None)
+    return np.fromiter(
+        (isinstance(v, str) and search(v) is not None for v in valores),
+        dtype=bool,
+        count=len(valores),
+    )
 
 
 # ------------------------------------------------------------
@@ -79,38 +178,46 @@ def norm_series(s: pd.Series) -> pd.Series:
 # ------------------------------------------------------------
 
 
-def _strict_map(df: pd.DataFrame, src: str, tgt: str) -> Tuple[Dict[str, str], int]:
+def _strict_map(
+    src: pd.Series, src_norm: pd.Series, tgt: pd.Series, tgt_norm: pd.Series
+) -> Tuple[Dict[str, str], int]:
     """
     Construye mapa src→tgt SOLO para fuentes que mapean a exactamente un único destino.
-    Regresa (mapping, conteo_de_fuentes_ambiguas).
+    Recibe cada columna cruda y ya normalizada (el valor que se rellena es
+    el destino crudo). Regresa (mapping, conteo_de_fuentes_ambiguas).
     """
-    sub = df[[src, tgt]].dropna().copy()
-    if sub.empty:
+    valid = src.notna() & tgt.notna()
+    if not valid.any():
         return {}, 0
-
-    sub["src_norm"] = norm_series(sub[src])
-    sub["tgt_norm"] = norm_series(sub[tgt])
+    sub = pd.DataFrame(
+        {"src_norm": src_norm[valid], "tgt": tgt[valid], "tgt_norm": tgt_norm[valid]}
+    )
 
     distinct = sub.groupby("src_norm")["tgt_norm"].nunique()
     strict_src = distinct[distinct == 1].index
 
-    choice = (
+    # Valor crudo más frecuente por fuente sin lambda por grupo: conteo por
+    # par y el primero tras un sort estable (en empate, el que apareció antes)
+    conteo = (
         sub[sub["src_norm"].isin(strict_src)]
-        .groupby("src_norm")[tgt]
-        .agg(lambda s: s.value_counts(dropna=True).index[0])
+        .groupby(["src_norm", "tgt"], sort=False, observed=True)
+        .size()
+        .sort_values(ascending=False, kind="stable")
     )
-    return choice.to_dict(), int((distinct > 1).sum())
+    choice = conteo[~conteo.index.get_level_values(0).duplicated()].index
+    return dict(choice), int((distinct > 1).sum())
 
 
 def cross_fill_colonias(
     df: pd.DataFrame,
     hecho_col: str = "colonia_hecho",
     cat_col: str = "colonia_catalogo",
+    inplace: bool = False,
 ) -> Tuple[pd.DataFrame, dict]:
     """
     Rellena catálogo desde hecho y hecho desde catálogo SOLO cuando el mapeo es 1→1 estricto.
     """
-    out = df.copy()
+    out = df if inplace else df.copy()
     if (hecho_col not in out.columns) or (cat_col not in out.columns):
         return out, {
             "catalogo_desde_hecho": 0,
@@ -119,17 +226,23 @@ def cross_fill_colonias(
             "fuentes_ambiguas_catalogo": 0,
         }
 
-    map_h2c, amb_h2c = _strict_map(out, hecho_col, cat_col)
-    map_c2h, amb_c2h = _strict_map(out, cat_col, hecho_col)
-
+    # Cada columna se normaliza una sola vez para ambos mapas y el relleno
     h_norm = norm_series(out[hecho_col])
     c_norm = norm_series(out[cat_col])
 
-    m1 = out[cat_col].isna() & h_norm.notna() & h_norm.map(lambda x: x in map_h2c)
-    m2 = out[hecho_col].isna() & c_norm.notna() & c_norm.map(lambda x: x in map_c2h)
+    map_h2c, amb_h2c = _strict_map(out[hecho_col], h_norm, out[cat_col], c_norm)
+    map_c2h, amb_c2h = _strict_map(out[cat_col], c_norm, out[hecho_col], h_norm)
+
+    # Un map vectorizado por lado (NaN = sin mapeo estricto); ambos se
+    # calculan antes de rellenar, así que un lado no usa lo que llenó el otro
+    desde_h = h_norm.map(map_h2c)
+    desde_c = c_norm.map(map_c2h)
 
-    out.loc[m1, cat_col] = h_norm[m1].map(map_h2c)
-    out.loc[m2, hecho_col] = c_norm[m2].map(map_c2h)
+    m1 = out[cat_col].isna() & desde_h.notna()
+    m2 = out[hecho_col].isna() & desde_c.notna()
+
+    out[cat_col] = out[cat_col].combine_first(desde_h)
+    out[hecho_col] = out[hecho_col].combine_first(desde_c)
 
     stats = {
         "catalogo_desde_hecho": int(m1.sum()),
@@ -145,14 +258,21 @@ def cross_fill_colonias(
 # ------------------------------------------------------------
 
 
-def fill_competencia(df: pd.DataFrame) -> Tuple[pd.DataFrame, dict]:
+# Compilados una sola vez al importar el módulo
+_FEDERAL_PAT = re.compile(r"(?:\bFGR\b|\bPGR\b|\bREPUBLICA\b|\bSEIDO\b|\bFEDERAL\b)")
+_LOCAL_PAT = re.compile(r"(?:\bFGJ\b|\bPGJ\b|\bCDMX\b|\bLOCAL\b|FUERO COMUN|JUSTICIA)")
+
+
+def fill_competencia(
+    df: pd.DataFrame, inplace: bool = False
+) -> Tuple[pd.DataFrame, dict]:
     """
     Compleción conservadora de 'competencia':
       1) Reglas por tokens en contexto institucional,
       2) moda por 'alcaldia_hecho',
       3) residuales a 'DESCONOCIDO'.
     """
-    out = df.copy()
+    out = df if inplace else df.copy()
 
     if "competencia" not in out.columns:
         out["competencia"] = pd.NA
@@ -168,34 +288,50 @@ def fill_competencia(df: pd.DataFrame) -> Tuple[pd.DataFrame, dict]:
         g("fiscalia") + " " + g("agencia") + " " + g("unidad_investigacion")
     ).str.strip()
 
-    federal_pat = re.compile(r"(?:\bFGR\b|\bPGR\b|\bREPUBLICA\b|\bSEIDO\b|\bFEDERAL\b)")
-    local_pat = re.compile(
-        r"(?:\bFGJ\b|\bPGJ\b|\bCDMX\b|\bLOCAL\b|FUERO COMUN|JUSTICIA)"
-    )
-
     # Reglas por tokens
-    m_fed = out["competencia"].isna() & contexto.str.contains(federal_pat, na=False)
-    out.loc[m_fed, "competencia"] = "FEDERAL"
+    # mask/fillna devuelven columnas nuevas: nunca se escribe dentro del
+    # arreglo original (el pipeline trabaja sobre una copia superficial)
+    contexto_arrow = ascii_arrow_text(contexto)
+    m_fed = out["competencia"].isna() & regex_contains(
+        contexto, _FEDERAL_PAT, contexto_arrow
+    )
+    out["competencia"] = out["competencia"].mask(m_fed, "FEDERAL")
 
-    m_loc = out["competencia"].isna() & contexto.str.contains(local_pat, na=False)
-    out.loc[m_loc, "competencia"] = "LOCAL"
+    m_loc = out["competencia"].isna() & regex_contains(
+        contexto, _LOCAL_PAT, contexto_arrow
+    )
+    out["competencia"] = out["competencia"].mask(m_loc, "LOCAL")
 
     before_na = int(out["competencia"].isna().sum())
 
     # Moda por alcaldía
     if "alcaldia_hecho" in out.columns:
-        modes = out.groupby("alcaldia_hecho", dropna=False)["competencia"].agg(
-            lambda s: (
-                s.mode(dropna=True).iloc[0] if not s.mode(dropna=True).empty else pd.NA
-            )
+        # Moda sin lambda por grupo: conteo por (alcaldía, competencia) e
+        # idxmax por alcaldía. idxmax toma el primero en orden, que en empate
+        # es el valor menor, igual que mode().iloc[0]
+        # La alcaldía entra como código de factorize: las filas sin alcaldía
+        # forman su propio grupo (como groupby(dropna=False)) y una columna
+        # categórica no deja grupos vacíos por categorías sin observar
+        alc_codes, _ = pd.factorize(out["alcaldia_hecho"], use_na_sentinel=False)
+        conteos = (
+            pd.DataFrame({"alc": alc_codes, "comp": out["competencia"].to_numpy()})
+            .dropna(subset=["comp"])
+            .groupby(["alc", "comp"])
+            .size()
+        )
+        modes = (
+            conteos.groupby(level=0).idxmax().str[1]
+            if len(conteos)
+            else pd.Series(dtype=object)
         )
-        out["competencia"] = out["competencia"].fillna(out["alcaldia_hecho"].map(modes))
+        moda_fila = pd.Series(modes.reindex(alc_codes).to_numpy(), index=out.index)
+        out["competencia"] = out["competencia"].fillna(moda_fila)
 
     after_mode_na = int(out["competencia"].isna().sum())
 
     # Residuales a DESCONOCIDO
     m_unk = out["competencia"].isna()
-    out.loc[m_unk, "competencia"] = "DESCONOCIDO"
+    out["competencia"] = out["competencia"].fillna("DESCONOCIDO")
 
     stats = {
         "desde_tokens_federal": int(m_fed.sum()),
@@ -211,12 +347,14 @@ def fill_competencia(df: pd.DataFrame) -> Tuple[pd.DataFrame, dict]:
 # ------------------------------------------------------------
 
 
-def fill_latlng_medians(df: pd.DataFrame) -> Tuple[pd.DataFrame, dict]:
+def fill_latlng_medians(
+    df: pd.DataFrame, inplace: bool = False
+) -> Tuple[pd.DataFrame, dict]:
     """
     Imputa 'latitud' y 'longitud' usando medianas a nivel 'colonia_hecho';
     recurre a medianas por 'alcaldia_hecho' cuando no hay mediana de colonia.
     """
-    out = df.copy()
+    out = df if inplace else df.copy()
     rep = {
         "lat_desde_colonia": 0,
         "lng_desde_colonia": 0,
@@ -227,33 +365,33 @@ def fill_latlng_medians(df: pd.DataFrame) -> Tuple[pd.DataFrame, dict]:
     if not all(c in out.columns for c in ["latitud", "longitud"]):
         return out, rep
 
-    # Nivel colonia
-    if "colonia_hecho" in out.columns:
-        med = out.groupby("colonia_hecho")[["latitud", "longitud"]].median(
-            numeric_only=True
-        )
-        m1 = out["latitud"].isna() & out["colonia_hecho"].map(med["latitud"]).notna()
-        m2 = out["longitud"].isna() & out["colonia_hecho"].map(med["longitud"]).notna()
-        rep["lat_desde_colonia"], rep["lng_desde_colonia"] = int(m1.sum()), int(
-            m2.sum()
-        )
-        out.loc[m1, "latitud"] = out.loc[m1, "colonia_hecho"].map(med["latitud"])
-        out.loc[m2, "longitud"] = out.loc[m2, "colonia_hecho"].map(med["longitud"])
-
-    # Nivel alcaldía
-    if "alcaldia_hecho" in out.columns:
-        med2 = out.groupby("alcaldia_hecho")[["latitud", "longitud"]].median(
-            numeric_only=True
-        )
-        m3 = out["latitud"].isna() & out["alcaldia_hecho"].map(med2["latitud"]).notna()
-        m4 = (
-            out["longitud"].isna() & out["alcaldia_hecho"].map(med2["longitud"]).notna()
-        )
-        rep["lat_desde_alcaldia"], rep["lng_desde_alcaldia"] = int(m3.sum()), int(
-            m4.sum()
+    # Primero colonia y luego alcaldía; la mediana de alcaldía ya incluye lo
+    # imputado por colonia. Las medianas se calculan por código entero de la
+    # llave (una tabla de ngrupos x 2) y se reparten a las filas con un take;
+    # la fila extra al final (NaN) es la que recibe el código -1 de los nulos.
+    for key, nivel in (("colonia_hecho", "colonia"), ("alcaldia_hecho", "alcaldia")):
+        if key not in out.columns:
+            continue
+        if isinstance(out[key].dtype, pd.CategoricalDtype):
+            codes = out[key].cat.codes.to_numpy()
+        else:
+            codes = pd.factorize(out[key])[0]
+        valid = codes >= 0
+        if not valid.any():
+            continue
+        med = (
+            out.loc[valid, ["latitud", "longitud"]]
+            .groupby(codes[valid])
+            .median()
+            .reindex(range(codes.max() + 1))
+            .to_numpy(dtype="float64")
         )
-        out.loc[m3, "latitud"] = out["alcaldia_hecho"].map(med2["latitud"])
-        out.loc[m4, "longitud"] = out["alcaldia_hecho"].map(med2["longitud"])
+        med = np.vstack([med, np.full((1, 2), np.nan)])[codes]
+        for i, (col, pref) in enumerate((("latitud", "lat"), ("longitud", "lng"))):
+            relleno = pd.Series(med[:, i], index=out.index)
+            m = out[col].isna() & relleno.notna()
+            rep[f"{pref}_desde_{nivel}"] = int(m.sum())
+            out[col] = out[col].fillna(relleno)
 
     return out, rep
 
@@ -285,10 +423,13 @@ def preview_drop_sparse(df: pd.DataFrame, col: str, threshold: float = 0.95):
 # ------------------------------------------------------------
 
 
-def _parse_date_flex(s: pd.Series) -> pd.Series:
+def parse_date_flex(s: pd.Series) -> pd.Series:
     """
     Parse robusto: intenta ISO estricto (YYYY-MM-DD); si no, dayfirst=True.
     """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        # Ya viene parseada: no hace falta pasar por texto
+        return s.dt.normalize()
     txt = s.astype("string")
     is_iso = txt.str.match(r"^\d{4}-\d{2}-\d{2}$", na=False)
     d0 = pd.to_datetime(txt.where(is_iso), errors="coerce", format="%Y-%m-%d")
@@ -301,24 +442,25 @@ def add_weekday_features(
     date_col: str = "fecha_hecho",
     name_col: str = "dia_semana",
     num_col: str = "dia_semana_num",
+    inplace: bool = False,
+    fechas: Optional[pd.Series] = None,
 ) -> pd.DataFrame:
     """
     Deriva número de día (Lun=1..Dom=7) y nombre de día en español desde `date_col`.
+    `fechas` permite pasar la columna ya parseada con parse_date_flex.
     """
-    out = df.copy()
-    dt = _parse_date_flex(out[date_col])
+    out = df if inplace else df.copy()
+    dt = parse_date_flex(out[date_col]) if fechas is None else fechas
     wnum = (dt.dt.weekday + 1).astype("Int64")
-    nombres = {
-        1: "LUNES",
-        2: "MARTES",
-        3: "MIERCOLES",
-        4: "JUEVES",
-        5: "VIERNES",
-        6: "SABADO",
-        7: "DOMINGO",
-    }
+    # Índice 0 = fecha nula; el nombre sale de un take sobre el número de día
+    nombres = np.array(
+        [None, "LUNES", "MARTES", "MIERCOLES", "JUEVES", "VIERNES", "SABADO", "DOMINGO"],
+        dtype=object,
+    )
     out[num_col] = wnum
-    out[name_col] = wnum.map(nombres).astype("string")
+    out[name_col] = pd.array(
+        nombres.take(wnum.fillna(0).to_numpy(dtype="int64")), dtype="string"
+    )
     return out
 
 
@@ -329,33 +471,36 @@ def add_quincena_window(
     out_col: str = "quincena",
     in_label: str = "Ventana",
     out_label: str = "No_ventana",
+    inplace: bool = False,
+    fechas: Optional[pd.Series] = None,
 ) -> pd.DataFrame:
     """
     Marca fechas dentro de ±window_days de:
       15 del mes, fin de mes actual, o fin de mes anterior.
+    `fechas` permite pasar la columna ya parseada con parse_date_flex.
     """
-    out = df.copy()
-    dt = _parse_date_flex(out[date_col])
-
-    eom = dt + pd.offsets.MonthEnd(0)
-    first_dom = dt.dt.to_period("M").dt.to_timestamp()
-    day15 = (first_dom + pd.Timedelta(days=14)).dt.normalize()
-    prev_eom = dt + pd.offsets.MonthEnd(-1)
-
-    dist = pd.concat(
-        [
-            (dt - day15).abs().dt.days.rename("D15"),
-            (dt - eom).abs().dt.days.rename("DEOM"),
-            (dt - prev_eom).abs().dt.days.rename("DPEOM"),
-        ],
-        axis=1,
+    out = df if inplace else df.copy()
+    dt = parse_date_flex(out[date_col]) if fechas is None else fechas
+
+    # Aritmética en días con datetime64 de NumPy (NaT se propaga y nunca
+    # queda dentro de la ventana)
+    dias = dt.to_numpy(dtype="datetime64[D]")
+    mes = dias.astype("datetime64[M]")
+    inicio_mes = mes.astype("datetime64[D]")
+    day15 = inicio_mes + 14
+    eom = (mes + 1).astype("datetime64[D]") - 1
+    prev_eom = inicio_mes - 1
+
+    nearest = np.minimum(
+        np.minimum(np.abs(dias - day15), np.abs(dias - eom)),
+        np.abs(dias - prev_eom),
     )
-    nearest = dist.min(axis=1)
-    in_win = nearest <= window_days
+    in_win = ~np.isnat(nearest) & (nearest <= np.timedelta64(window_days, "D"))
 
-    out[out_col] = (
-        in_win.fillna(False).map({True: in_label, False: out_label}).astype("string")
-    )
+    # Etiqueta por take sobre un arreglo de dos valores (sin el arreglo
+    # unicode intermedio de np.where ni convertir cada fila a str)
+    etiquetas = np.array([out_label, in_label], dtype=object)
+    out[out_col] = pd.array(etiquetas[in_win.view(np.int8)], dtype="string")
     return out
 
 
@@ -364,6 +509,35 @@ def add_quincena_window(
 # ------------------------------------------------------------
 
 
+def _date_key(fechas: pd.Series) -> pd.Series:
+    """Fecha sin hora y en una sola resolución para que ambos lados empaten."""
+    if fechas.dt.tz is not None:
+        fechas = fechas.dt.tz_localize(None)
+    return fechas.dt.normalize().astype("datetime64[ns]")
+
+
+def _alcaldia_key(
+    alcaldias: pd.Series, clima_keys: pd.Series
+) -> Tuple[pd.Categorical, pd.CategoricalDtype]:
+    """
+    Alcaldía normalizada como Categorical sobre la unión de llaves de ambos
+    lados. Si la columna ya es categórica solo se normalizan sus categorías.
+    """
+    if isinstance(alcaldias.dtype, pd.CategoricalDtype):
+        cats_norm = norm_series(pd.Series(alcaldias.cat.categories, dtype=object))
+    else:
+        cats_norm = norm_series(alcaldias)
+    key_dtype = pd.CategoricalDtype(
+        sorted(set(cats_norm.dropna()) | set(clima_keys.dropna()))
+    )
+    if isinstance(alcaldias.dtype, pd.CategoricalDtype):
+        # Código viejo -> código nuevo; el -1 final conserva los nulos
+        mapa = np.append(key_dtype.categories.get_indexer(cats_norm), -1)
+        codes = mapa[alcaldias.cat.codes.to_numpy()]
+        return pd.Categorical.from_codes(codes, dtype=key_dtype), key_dtype
+    return pd.Categorical(cats_norm, dtype=key_dtype), key_dtype
+
+
 def add_weather_by_alcaldia_fecha(
     df: pd.DataFrame,
     clima_csv_path: str,
@@ -371,42 +545,47 @@ def add_weather_by_alcaldia_fecha(
     date_col: str = "fecha_hecho",
     out_temp: str = "clima_temperatura",
     out_cond: str = "clima_condicion",
+    fechas: Optional[pd.Series] = None,
 ) -> Tuple[pd.DataFrame, dict]:
     """
     LEFT join de clima diario (temp, condición) por alcaldía normalizada + fecha (YYYY-MM-DD)
-    sobre el dataset de delitos.
+    sobre el dataset de delitos. El merge ya devuelve un df nuevo, así que
+    no se copia `df` antes.
+    `fechas` permite pasar la columna ya parseada con parse_date_flex.
     """
-    out = df.copy()
-
-    clima = robust_read_csv(clima_csv_path)
 
-    need = {"name", "datetime", "temp", "conditions"}
-    if not need.issubset(clima.columns):
-        raise KeyError(f"Weather CSV must contain: {sorted(need)}")
+    # Primero solo el encabezado: el CSV de clima trae decenas de columnas
+    # y PyArrow puede parsear únicamente las cuatro que se usan
+    cols = ["name", "datetime", "temp", "conditions"]
+    header = robust_read_csv(clima_csv_path, nrows=0).columns
+    if not set(cols).issubset(header):
+        raise KeyError(f"Weather CSV must contain: {sorted(cols)}")
 
-    clima = clima[["name", "datetime", "temp", "conditions"]].copy()
+    clima = robust_read_csv(clima_csv_path, usecols=cols)[cols].copy()
     clima["name_key"] = norm_series(clima["name"])
-    clima["date_key"] = (
+    # Llave de fecha como datetime64 truncado al día: mismo emparejamiento
+    # que el texto YYYY-MM-DD sin formatear cada fila con strftime
+    clima["date_key"] = _date_key(
         pd.to_datetime(clima["datetime"], errors="coerce", dayfirst=False)
-        .dt.strftime("%Y-%m-%d")
-        .astype("string")
     )
     clima = clima.rename(columns={"temp": out_temp, "conditions": out_cond})
     clima[out_cond] = clima[out_cond].astype("string").str.strip().str.split().str[0]
 
-    out["alcaldia_key"] = norm_series(out[alcaldia_col])
-    out["date_key"] = (
-        pd.to_datetime(out[date_col], errors="coerce")
-        .dt.strftime("%Y-%m-%d")
-        .astype("string")
-    )
+    # Llaves del lado izquierdo como arreglos: no se agregan columnas a `df`.
+    # Alcaldía va como categórica con las mismas categorías en ambos lados,
+    # así el merge compara códigos enteros en vez de textos
+    alcaldia_key, key_dtype = _alcaldia_key(df[alcaldia_col], clima["name_key"])
+    clima["name_key"] = clima["name_key"].astype(key_dtype)
+    if fechas is None:
+        fechas = pd.to_datetime(df[date_col], errors="coerce")
+    date_key = _date_key(fechas)
 
-    out = out.merge(
+    out = df.merge(
         clima[["name_key", "date_key", out_temp, out_cond]],
-        left_on=["alcaldia_key", "date_key"],
+        left_on=[alcaldia_key, date_key.array],
         right_on=["name_key", "date_key"],
         how="left",
-    ).drop(columns=["alcaldia_key", "name_key"], errors="ignore")
+    ).drop(columns=["name_key"], errors="ignore")
 
     stats = {
         "registros_con_clima": int(out[out_temp].notna().sum()),
@@ -453,24 +632,25 @@ REGIONES_CDMX = {
 }
 
 
+# Quita acentos de vocales en una sola pasada (str.translate)
+_ACCENT_TBL = str.maketrans("áéíóúÁÉÍÓÚ", "aeiouaeiou")
+
+
 def _norm_simple(s):
     if pd.isna(s):
         return None
-    s = str(s).strip().lower()
-    s = (
-        s.replace("á", "a")
-        .replace("é", "e")
-        .replace("í", "i")
-        .replace("ó", "o")
-        .replace("ú", "u")
-    )
-    return s
+    return str(s).strip().lower().translate(_ACCENT_TBL)
 
 
 REGIONES_NORM = {
     region: [_norm_simple(a) for a in alcs] for region, alcs in REGIONES_CDMX.items()
 }
 
+# Alcaldía normalizada → región, plano para buscar en O(1)
+REGION_LOOKUP = {
+    alc: region for region, alcs in REGIONES_NORM.items() for alc in alcs
+}
+
 
 def asignar_region(alcaldia: str) -> str:
     """
@@ -479,10 +659,7 @@ def asignar_region(alcaldia: str) -> str:
     alc_norm = _norm_simple(alcaldia)
     if alc_norm is None:
         return None
-    for region, lista_alcs in REGIONES_NORM.items():
-        if alc_norm in lista_alcs:
-            return region
-    return "Desconocido"
+    return REGION_LOOKUP.get(alc_norm, "Desconocido")
 
 
 # ------------------------------------------------------------
@@ -523,14 +700,7 @@ _MESES_ES = {
 def mes_a_espanol(s):
     if pd.isna(s):
         return None
-    s_norm = str(s).strip().lower()
-    s_norm = (
-        s_norm.replace("á", "a")
-        .replace("é", "e")
-        .replace("í", "i")
-        .replace("ó", "o")
-        .replace("ú", "u")
-    )
+    s_norm = str(s).strip().lower().translate(_ACCENT_TBL)
 
     if s_norm in _MESES_ES:
         return s_norm.capitalize()
@@ -561,3 +731,21 @@ def clasificar_hora(h) -> str:
         return "Tarde"
     else:  # 19:00 - 04:59
         return "Noche"
+
+
+_CORTES_HORA = np.array([5 * 60, 12 * 60, 19 * 60], dtype="float64")
+_ETIQUETAS_HORA = np.array(["Noche", "Mañana", "Tarde", "Noche", None], dtype=object)
+
+
+def clasificar_hora_series(horas: pd.Series) -> pd.Series:
+    """
+    Versión vectorizada de clasificar_hora para una serie datetime64
+    (NaT -> None). Evita el apply fila por fila.
+    """
+    minutos = (horas.dt.hour * 60 + horas.dt.minute).to_numpy(
+        dtype="float64", na_value=np.nan
+    )
+    # Cortes 05:00 / 12:00 / 19:00 -> tramo 0..3; NaN cae en el tramo extra (None)
+    tramo = np.searchsorted(_CORTES_HORA, minutos, side="right")
+    tramo[np.isnan(minutos)] = len(_ETIQUETAS_HORA) - 1
+    return pd.Series(_ETIQUETAS_HORA[tramo], index=horas.index)
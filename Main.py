@@ -1,6 +1,7 @@
 import streamlit as st
 from pathlib import Path
 
+from core.data_loader import prefetch_central_dataset
 from ui.theme_dark import apply_theme
 
 # =========================================
@@ -11,10 +12,16 @@ st.set_page_config(
     page_icon=":material/analytics:",
     layout="wide",
 )
+# Tema global: se inyecta aquí una sola vez por ejecución para todas las
+# páginas (st.navigation ejecuta este archivo antes de cada página).
 apply_theme()
 
 BASE = Path(__file__).parent
 
+# Precarga del dataset histórico en segundo plano (una vez por proceso):
+# las páginas 2, 4 y 5 lo encuentran ya en caché
+prefetch_central_dataset()
+
 # =========================================
 # ESTADO
 # =========================================
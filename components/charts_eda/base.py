@@ -1,12 +1,21 @@
 # components/charts_eda/base.py
 from __future__ import annotations
 
+import io
 from typing import Iterable, Optional, Tuple, List
 
+import matplotlib
+
+# Backend sin GUI: las figuras solo se rasterizan a PNG (figure_to_png), así
+# que no hace falta inicializar Tk/Qt al importar pyplot
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np
 import pandas as pd
 
 # COLUMNAS CLAVE 
-HORA_COL = "hour_int"              # hora en entero 0–23
+HORA_COL = "hour_int"              # hora en entero 0–23 (Int8)
 RAW_HOUR_COL = "hora_hecho"        
 
 # Aliases para compatibilidad con código viejo
@@ -71,6 +80,18 @@ PALETTE = {
 }
 
 
+# FIGURA → PNG
+def figure_to_png(fig) -> bytes:
+    """
+    Serializa una figura de matplotlib a PNG y la cierra.
+    Permite cachear la imagen ya renderizada en lugar de la figura.
+    """
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight", facecolor=fig.get_facecolor())
+    plt.close(fig)
+    return buf.getvalue()
+
+
 # NORMALIZAR HORA 
 def normalize_hour_column(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -78,17 +99,32 @@ def normalize_hour_column(df: pd.DataFrame) -> pd.DataFrame:
     No rompe nada si ya existe.
     """
     if HORA_COL in df.columns:
-        df[HORA_COL] = pd.to_numeric(df[HORA_COL], errors="coerce").astype("Int64")
+        df[HORA_COL] = pd.to_numeric(df[HORA_COL], errors="coerce").astype("Int8")
         return df
 
     if RAW_HOUR_COL in df.columns:
         parsed = pd.to_datetime(df[RAW_HOUR_COL], format="%H:%M:%S", errors="coerce")
-        df[HORA_COL] = parsed.dt.hour.astype("Int64")
+        df[HORA_COL] = parsed.dt.hour.astype("Int8")
 
     return df
 
 
 # FILTROS COMUNES 
+def _hour_values(df: pd.DataFrame) -> Optional[pd.Series]:
+    """
+    HORA_COL (0–23, Int8) calculada como normalize_hour_column, sin
+    modificar `df`. None si no hay columna de hora.
+    """
+    if HORA_COL in df.columns:
+        if df[HORA_COL].dtype == "Int8":
+            return df[HORA_COL]
+        return pd.to_numeric(df[HORA_COL], errors="coerce").astype("Int8")
+    if RAW_HOUR_COL in df.columns:
+        parsed = pd.to_datetime(df[RAW_HOUR_COL], format="%H:%M:%S", errors="coerce")
+        return parsed.dt.hour.astype("Int8")
+    return None
+
+
 def apply_common_filters(
     df: pd.DataFrame,
     hour_range: Optional[Tuple[int, int]] = None,
@@ -100,39 +136,51 @@ def apply_common_filters(
     """
     Aplica TODOS los filtros globales al DataFrame de forma consistente.
     Cualquier parámetro en None o "Todos"/"Todas" se IGNORA.
-    """
-    df_f = df.copy()
 
-    # Normalizar hora
-    df_f = normalize_hour_column(df_f)
+    Los filtros se combinan en una sola máscara booleana y solo se copian
+    las filas seleccionadas; `df` (el DataFrame compartido del caché) no se
+    copia completo ni se modifica. Sin filtros activos se devuelve una copia
+    superficial: el llamador puede asignar columnas, no editar valores.
+    """
+    mask = np.ones(len(df), dtype=bool)
 
     # Hora
-    if (
-        hour_range is not None
-        and HORA_COL in df_f.columns
-        and pd.notna(df_f[HORA_COL]).any()
-    ):
+    horas = _hour_values(df)
+    if hour_range is not None and horas is not None and horas.notna().any():
         h0, h1 = hour_range
-        df_f = df_f[(df_f[HORA_COL] >= h0) & (df_f[HORA_COL] <= h1)]
+        mask &= ((horas >= h0) & (horas <= h1)).to_numpy(dtype=bool, na_value=False)
 
     # Mes
-    if mes and mes != "Todos" and MONTH_COL in df_f.columns:
-        df_f = df_f[df_f[MONTH_COL] == mes]
+    if mes and mes != "Todos" and MONTH_COL in df.columns:
+        mask &= (df[MONTH_COL] == mes).to_numpy(dtype=bool)
 
     # Día de la semana
-    if dia_semana and dia_semana != "Todos" and WEEKDAY_COL in df_f.columns:
-        df_f = df_f[df_f[WEEKDAY_COL] == dia_semana]
+    if dia_semana and dia_semana != "Todos" and WEEKDAY_COL in df.columns:
+        mask &= (df[WEEKDAY_COL] == dia_semana).to_numpy(dtype=bool)
 
     # Zona / región CDMX
-    if zona and zona != "Todas" and ZONA_COL in df_f.columns:
-        df_f = df_f[df_f[ZONA_COL] == zona]
+    if zona and zona != "Todas" and ZONA_COL in df.columns:
+        mask &= (df[ZONA_COL] == zona).to_numpy(dtype=bool)
 
     # Tipo de crimen (macro)
     if tipos_crimen:
         tipos_crimen = list(tipos_crimen)
-        if DELITO_MACRO_COL in df_f.columns:
-            df_f = df_f[df_f[DELITO_MACRO_COL].isin(tipos_crimen)]
-        elif DELITO_COL in df_f.columns:
-            df_f = df_f[df_f[DELITO_COL].isin(tipos_crimen)]
-
+        if DELITO_MACRO_COL in df.columns:
+            mask &= df[DELITO_MACRO_COL].isin(tipos_crimen).to_numpy(dtype=bool)
+        elif DELITO_COL in df.columns:
+            mask &= df[DELITO_COL].isin(tipos_crimen).to_numpy(dtype=bool)
+
+    if mask.all():
+        df_f = df.copy(deep=False)
+    else:
+        rows = np.flatnonzero(mask)
+        df_f = df.take(rows)
+        if horas is not None:
+            horas = horas.take(rows)
+
+    # Hora normalizada en el resultado (igual que normalize_hour_column)
+    if horas is not None and (
+        HORA_COL not in df.columns or df[HORA_COL].dtype != "Int8"
+    ):
+        df_f[HORA_COL] = horas
     return df_f
@@ -7,35 +7,33 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import streamlit as st
 
+from core.data_loader import dataset_version
 from .base import (
     PALETTE,
     HOUR_COL,
     DIA_COL,
     DAY_ORDER,
     apply_common_filters,
+    figure_to_png,
 )
 
 
-def render_hourly_heatmap(
+def _day_hour_pivot(
     df: pd.DataFrame,
-    hour_range: Optional[Tuple[int, int]],
     mes: Optional[str],
     dia_semana: Optional[str],
     zona: Optional[str],
-    tipos_crimen: Optional[Iterable[str]],
-) -> None:
+    tipos_crimen: Optional[Tuple[str, ...]],
+) -> pd.DataFrame:
     """
-    Heatmap Día de la semana vs Hora del día.
+    Tabla día × hora (conteos) con todos los filtros excepto el horario.
 
-    - Filtra por rango horario, mes, día específico, zona y tipo de crimen.
-    - El eje X SOLO muestra las horas dentro del rango seleccionado
-      (por ejemplo, 0–10) sin dejar columnas en blanco.
+    El rango de horas solo recorta columnas, así que mover el slider
+    reutiliza esta tabla en lugar de reagrupar todo el DataFrame.
     """
-
-    # Aplicar filtros comunes
     df_f = apply_common_filters(
         df,
-        hour_range=hour_range,
+        hour_range=None,
         mes=mes,
         dia_semana=dia_semana,
         zona=zona,
@@ -43,30 +41,63 @@ def render_hourly_heatmap(
     )
 
     if df_f.empty or HOUR_COL not in df_f.columns or DIA_COL not in df_f.columns:
-        st.info("No hay datos para los filtros seleccionados (heatmap).")
-        return
+        return pd.DataFrame()
 
-    # Agrupar por día y hora
-    grp = (
-        df_f.groupby([DIA_COL, HOUR_COL])
+    # Tabla dinámica: filas = día, columnas = hora
+    pivot = (
+        df_f.groupby([DIA_COL, HOUR_COL], observed=True)
         .size()
-        .reset_index(name="conteo")
+        .unstack(fill_value=0)
     )
 
-    if grp.empty:
-        st.info("No hay datos para los filtros seleccionados (heatmap).")
-        return
-
-    # Tabla dinámica: filas = día, columnas = hora
-    pivot = grp.pivot(
-        index=DIA_COL,
-        columns=HOUR_COL,
-        values="conteo",
-    ).fillna(0)
-
     # Ordenar días de la semana
     ordered_days = [d for d in DAY_ORDER if d in pivot.index]
-    pivot = pivot.loc[ordered_days]
+    return pivot.loc[ordered_days]
+
+
+# Solo se cachea la tabla (7 × 24). El DataFrame no se hashea: lo identifica
+# su dataset_version, que cambia cada vez que se recarga el dataset.
+@st.cache_data(show_spinner=False, max_entries=32)
+def _day_hour_pivot_cached(
+    version: str,
+    mes: Optional[str],
+    dia_semana: Optional[str],
+    zona: Optional[str],
+    tipos_crimen: Optional[Tuple[str, ...]],
+    _df: pd.DataFrame,
+) -> pd.DataFrame:
+    """_day_hour_pivot memoizada por versión del dataset y filtros."""
+    return _day_hour_pivot(_df, mes, dia_semana, zona, tipos_crimen)
+
+
+def render_hourly_heatmap(
+    df: pd.DataFrame,
+    hour_range: Optional[Tuple[int, int]],
+    mes: Optional[str],
+    dia_semana: Optional[str],
+    zona: Optional[str],
+    tipos_crimen: Optional[Iterable[str]],
+) -> None:
+    """
+    Heatmap Día de la semana vs Hora del día.
+
+    - Filtra por rango horario, mes, día específico, zona y tipo de crimen.
+    - El eje X SOLO muestra las horas dentro del rango seleccionado
+      (por ejemplo, 0–10) sin dejar columnas en blanco.
+    """
+
+    filtros = dict(
+        mes=mes,
+        dia_semana=dia_semana,
+        zona=zona,
+        tipos_crimen=tuple(tipos_crimen) if tipos_crimen else None,
+    )
+    version = dataset_version(df)
+    if version is None:
+        # DataFrame que no es el dataset central vigente: sin caché
+        pivot = _day_hour_pivot(df, **filtros)
+    else:
+        pivot = _day_hour_pivot_cached(version, **filtros, _df=df)
 
     # Limitar columnas a las horas seleccionadas en el slider
     if hour_range is not None:
@@ -79,10 +110,18 @@ def render_hourly_heatmap(
         cols = sorted(pivot.columns)
         pivot = pivot[cols]
 
-    if pivot.empty:
+    if pivot.empty or pivot.to_numpy().sum() == 0:
         st.info("No hay datos para los filtros seleccionados (heatmap).")
         return
 
+    st.image(_heatmap_png(pivot), use_container_width=True)
+
+
+# La tabla es pequeña (7 × 24): hashear su contenido es barato y evita
+# reconstruir la figura cuando los filtros no cambian.
+@st.cache_data(show_spinner=False, max_entries=64)
+def _heatmap_png(pivot: pd.DataFrame) -> bytes:
+    """Dibuja el heatmap día × hora y lo devuelve como PNG."""
     # Construir figura
     fig, ax = plt.subplots(figsize=(6.4, 3.6), dpi=150)
     fig.patch.set_facecolor(PALETTE["bg_fig"])
@@ -116,4 +155,4 @@ def render_hourly_heatmap(
     cbar.set_label("Número de delitos", fontsize=11, color=PALETTE["text"])
     cbar.ax.tick_params(labelsize=9, colors=PALETTE["text"])
 
-    st.pyplot(fig, clear_figure=True)
+    return figure_to_png(fig)
@@ -13,6 +13,7 @@ from .base import (
     DELITO_MACRO_COL,
     MONTH_COL,
     apply_common_filters,
+    figure_to_png,
 )
 
 
@@ -77,7 +78,7 @@ def render_monthly_stacked_percent(
     df_f[MONTH_COL] = df_f[MONTH_COL].astype(str).apply(normalize_month)
 
     grp = (
-        df_f.groupby([MONTH_COL, DELITO_MACRO_COL])
+        df_f.groupby([MONTH_COL, DELITO_MACRO_COL], observed=True)
         .size()
         .reset_index(name="conteo")
     )
@@ -95,6 +96,14 @@ def render_monthly_stacked_percent(
     ordered = [m for m in MONTH_ORDER if m in pivot.index]
     pivot = pivot.loc[ordered]
 
+    st.image(_stacked_png(pivot), use_container_width=True)
+
+
+# La tabla es pequeña (12 meses × macrogrupos): hashear su contenido es
+# barato y evita reconstruir la figura cuando los filtros no cambian.
+@st.cache_data(show_spinner=False, max_entries=64)
+def _stacked_png(pivot: pd.DataFrame) -> bytes:
+    """Dibuja las barras apiladas por mes y las devuelve como PNG."""
     fig, ax = plt.subplots(figsize=(14, 6), dpi=150)
     fig.patch.set_facecolor(PALETTE["bg_fig"])
     ax.set_facecolor(PALETTE["bg_axes"])
@@ -149,4 +158,4 @@ def render_monthly_stacked_percent(
         text.set_color(PALETTE["text"])
     leg.get_title().set_color(PALETTE["text"])
 
-    st.pyplot(fig, clear_figure=True)
+    return figure_to_png(fig)
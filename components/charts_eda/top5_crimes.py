@@ -39,6 +39,7 @@ def render_top5_crimes_bar(
     counts = (
         df_f[DELITO_MACRO_COL]
         .value_counts(normalize=False)
+        .loc[lambda s: s > 0]  # categorías sin registros tras filtrar
         .head(5)
         .reset_index()
     )
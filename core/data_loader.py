@@ -1,8 +1,14 @@
 from pathlib import Path
+import itertools
 import json
+import threading
+import weakref
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import streamlit as st
+from pyarrow import feather
 
 # Resolve project root directory (one level above /core/)
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -10,17 +16,218 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Path to the main dataset used across the platform
 DATASET_PATH = BASE_DIR / "Database" / "FGJ_CLEAN_Final.csv"
 
+# Columnar copy of the main dataset (see tools/convert_dataset_to_parquet.py)
+DATASET_PARQUET_PATH = DATASET_PATH.with_suffix(".parquet")
+
+# Uncompressed Arrow IPC side-car written next to the Parquet copy; it is
+# memory-mapped on load, so a cold cache skips decompression entirely
+DATASET_ARROW_PATH = DATASET_PATH.with_suffix(".arrow")
+
 # Path to the colonias polygons used for mapping
 COLONIAS_GEOJSON_PATH = BASE_DIR / "Geodata" / "colonias_iecm.geojson"
 
+# Low-cardinality columns used by filters and groupbys, stored as categoricals
+CATEGORY_COLUMNS = [
+    "region_cdmx",
+    "mes_hecho",
+    "dia",
+    "delito_grupo_macro",
+    "delito_grupo",
+    "alcaldia_hecho",
+    "periodo_hora",
+]
+
+# Row-group size used when writing the Parquet copy
+PARQUET_ROW_GROUP_SIZE = 200_000
+
+# (weak reference to the frame load_central_dataset() returned last, its
+# version token); a new token is issued on every load, see dataset_version()
+_LOAD_COUNTER = itertools.count(1)
+_central_loaded = None
+
+
+def active_dataset_path() -> Path:
+    """
+    Return the file load_central_dataset() reads: the Arrow side-car if it
+    is at least as recent as the Parquet copy, then Parquet, then the CSV.
+    """
+    if DATASET_PARQUET_PATH.exists():
+        if (
+            DATASET_ARROW_PATH.exists()
+            and DATASET_ARROW_PATH.stat().st_mtime >= DATASET_PARQUET_PATH.stat().st_mtime
+        ):
+            return DATASET_ARROW_PATH
+        return DATASET_PARQUET_PATH
+    return DATASET_PATH
+
 
-@st.cache_data(show_spinner="Cargando datos históricos…")
+@st.cache_resource(show_spinner="Cargando datos históricos…", ttl=24 * 60 * 60)
 def load_central_dataset() -> pd.DataFrame:
     """
     Load the central historical dataset used across the application.
     Cached for better performance in all pages.
+
+    The same DataFrame object is shared by every page and session (no
+    pickling on each access), so callers must treat it as read-only and
+    call `.copy()` before mutating it.
+
+    The columnar copies are preferred when present (see
+    active_dataset_path); otherwise the CSV is parsed with the
+    multi-threaded PyArrow engine. Filter columns are converted to
+    categoricals so masks compare integer codes.
+    """
+    path = active_dataset_path()
+    if path == DATASET_ARROW_PATH:
+        df = feather.read_table(path, memory_map=True).to_pandas()
+    elif path == DATASET_PARQUET_PATH:
+        df = pd.read_parquet(path, engine="pyarrow")
+    else:
+        df = pd.read_csv(path, engine="pyarrow")
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    # Parse the incident date once here; otherwise readers that need a
+    # datetime column copy the whole shared frame on every rerun.
+    if "fecha_hecho" in df.columns and not pd.api.types.is_datetime64_any_dtype(
+        df["fecha_hecho"]
+    ):
+        df["fecha_hecho"] = pd.to_datetime(df["fecha_hecho"], errors="coerce")
+
+    global _central_loaded
+    _central_loaded = (weakref.ref(df), f"{path.name}#{next(_LOAD_COUNTER)}")
+    return df
+
+
+def dataset_version(df: pd.DataFrame) -> str | None:
+    """
+    Cache key for `df` if it is the frame load_central_dataset() currently
+    returns, else None (any other or outdated frame).
+
+    The token changes on every load, including the reload after
+    save_central_dataset(), so results cached under it are never served
+    for a different version of the dataset. Use it in place of hashing the
+    (multi-million-row) frame itself.
+    """
+    loaded = _central_loaded
+    if loaded is not None and loaded[0]() is df:
+        return loaded[1]
+    return None
+
+
+def align_batch_dtypes(batch: pd.DataFrame, reference: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast `batch` columns to the dtypes load_central_dataset() gives them in
+    `reference`, so concat neither falls back to object columns mixing
+    strings with parsed values nor produces a frame Arrow cannot write.
+
+    - Categorical columns get the same categories (kept as codes); columns
+      with values outside those categories are left untouched.
+    - Datetime columns are parsed the same way the loader parses them.
+    """
+    casts = {}
+    for col in batch.columns.intersection(reference.columns):
+        dtype = reference[col].dtype
+        if batch[col].dtype == dtype:
+            continue
+        if isinstance(dtype, pd.CategoricalDtype):
+            values = batch[col].dropna().unique()
+            if pd.Index(values).isin(dtype.categories).all():
+                casts[col] = batch[col].astype(dtype)
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            if not pd.api.types.is_datetime64_any_dtype(batch[col]):
+                casts[col] = pd.to_datetime(batch[col], errors="coerce")
+    return batch.assign(**casts) if casts else batch
+
+
+def combine_with_central(central: pd.DataFrame, batch: pd.DataFrame) -> pd.DataFrame:
+    """
+    Append a cleaned batch to the central dataset, ready for
+    save_central_dataset(). Duplicates are not removed.
+    """
+    # concat aligns on the union of column names by itself; reindexing
+    # both frames first would add two full copies of the historical dataset.
+    batch = align_batch_dtypes(batch, central)
+    if batch.columns.symmetric_difference(central.columns).empty:
+        # Same schema (the usual case): put the batch in the historical
+        # column order so concat skips building the column union.
+        batch = batch[central.columns]
+    return pd.concat([central, batch], ignore_index=True, sort=False)
+
+
+@st.cache_resource(show_spinner=False)
+def prefetch_central_dataset() -> threading.Thread:
+    """
+    Start loading the central dataset in a background thread, once per
+    server process, so the first page that needs it finds the cache warm.
+
+    A page that asks for the dataset while the thread is still loading just
+    waits for that same computation; it does not start a second one.
     """
-    return pd.read_csv(DATASET_PATH, low_memory=False)
+    thread = threading.Thread(
+        target=load_central_dataset,
+        name="prefetch-central-dataset",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def _arrow_safe_objects(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert object columns that mix value types (e.g. text and Timestamps,
+    text and numbers) to text, nulls kept, so Arrow can give them a type.
+    """
+    fixes = {}
+    for col in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[col], skipna=True) in ("mixed", "mixed-integer"):
+            fixes[col] = df[col].map(str, na_action="ignore")
+    return df.assign(**fixes) if fixes else df
+
+
+def save_central_dataset(df: pd.DataFrame) -> Path:
+    """
+    Persist a new version of the central dataset.
+
+    It is written as ZSTD-compressed Parquet (the archival copy) plus an
+    uncompressed Arrow side-car for fast loads, and the cached copy is
+    cleared so the next load picks it up.
+
+    Rows are converted to Arrow one row group at a time and each batch is
+    streamed to both files, so the whole frame is never duplicated as a
+    single Arrow table. Both files are written to temporary paths first and
+    only replace the current ones once complete; if the frame cannot be
+    converted, they are removed and a ValueError naming the cause is raised
+    (the current dataset is left as it was).
+    """
+    df = _arrow_safe_objects(df)
+    parquet_tmp = DATASET_PARQUET_PATH.with_suffix(".parquet.tmp")
+    arrow_tmp = DATASET_ARROW_PATH.with_suffix(".arrow.tmp")
+
+    try:
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        with (
+            pq.ParquetWriter(parquet_tmp, schema, compression="zstd") as parquet_writer,
+            pa.ipc.new_file(arrow_tmp, schema) as arrow_writer,
+        ):
+            for start in range(0, len(df), PARQUET_ROW_GROUP_SIZE):
+                chunk = df.iloc[start:start + PARQUET_ROW_GROUP_SIZE]
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                parquet_writer.write_table(table)
+                arrow_writer.write_table(table)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        parquet_tmp.unlink(missing_ok=True)
+        arrow_tmp.unlink(missing_ok=True)
+        raise ValueError(f"The dataset could not be converted to Arrow: {e}") from e
+
+    # Parquet first, Arrow last: the side-car must end up at least as recent
+    # for active_dataset_path() to prefer it
+    parquet_tmp.replace(DATASET_PARQUET_PATH)
+    arrow_tmp.replace(DATASET_ARROW_PATH)
+
+    load_central_dataset.clear()
+    return DATASET_PARQUET_PATH
 
 
 @st.cache_data(show_spinner="Cargando polígonos de colonias…")
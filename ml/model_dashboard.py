@@ -15,19 +15,21 @@ from ml.ml_kpis import get_tipo_options, resolve_prob_column, compute_kpis
 # -------------------------------------------------
 # Helper: encontrar la columna de colonia
 # -------------------------------------------------
+COLONIA_CANDIDATES = (
+    "colonia",
+    "COLONIA",
+    "colonia_catalogo",
+    "COLONIA_CATALOGO",
+    "nom_colonia",
+    "NOMUT",
+)
+
+
 def _find_colonia_col(df: pd.DataFrame | None) -> str | None:
     if df is None:
         return None
 
-    candidates = [
-        "colonia",
-        "COLONIA",
-        "colonia_catalogo",
-        "COLONIA_CATALOGO",
-        "nom_colonia",
-        "NOMUT",
-    ]
-    for c in candidates:
+    for c in COLONIA_CANDIDATES:
         if c in df.columns:
             return c
 
@@ -52,6 +54,10 @@ SPANISH_COL_NAMES = {
 }
 
 
+# Columnas de probabilidad por tipo (tacómetros), sin el total
+TIPO_PROB_COLS = tuple(c for c in SPANISH_COL_NAMES if c != "prob_total")
+
+
 def fmt_dec4(x):
     try:
         return float(f"{float(x):.4f}")
@@ -59,6 +65,27 @@ def fmt_dec4(x):
         return x
 
 
+# -------------------------------------------------
+# Tarjetas KPI (estilos en ui/kpi_styles.css)
+# -------------------------------------------------
+KPI_CARD_CLASSES = ("kpi-card", "kpi-card alt-1", "kpi-card alt-2", "kpi-card alt-3")
+
+
+def _kpi_grid_html(cards) -> str:
+    """Arma la fila de KPIs a partir de tuplas (etiqueta, valor, subtexto)."""
+    items = "".join(
+        f"""
+        <div class="{css}">
+          <div class="kpi-label">{label}</div>
+          <div class="kpi-value">{value}</div>
+          <div class="kpi-subtext">{subtext}</div>
+        </div>
+        """
+        for css, (label, value, subtext) in zip(KPI_CARD_CLASSES, cards)
+    )
+    return f'<div class="kpi-grid-row1">{items}</div>'
+
+
 # -------------------------------------------------
 # FUNCIÓN PRINCIPAL DEL DASHBOARD (llamar desde página 1)
 # -------------------------------------------------
@@ -109,6 +136,25 @@ def run_model_dashboard(bundle) -> None:
         get_tipo_options(),
     )
 
+    # Filtro de nivel de riesgo
+    risk_filter = st.sidebar.selectbox(
+        "Escala de riesgo (nivel global)",
+        ["Todos", "Muy bajo", "Bajo", "Medio", "Alto", "Muy alto"],
+        index=0,
+    )
+
+    # Reproducción automática (solo en modo serie)
+    velocidad = 0.5
+    if modo_tiempo != "Punto en el tiempo":
+        velocidad = st.sidebar.slider(
+            "Velocidad de reproducción (seg/frame)",
+            min_value=0.1,
+            max_value=2.0,
+            value=0.5,
+            step=0.1,
+        )
+        st.sidebar.button("▶ Iniciar reproducción", key="btn_reproducir")
+
     # ================= TÍTULO + DESCRIPCIÓN ==================
     st.title("🔮 Panel de predicción de riesgo delictivo por colonia")
 
@@ -124,9 +170,42 @@ para una fecha y hora específicas.
         """
     )
 
+    dt_punto = (
+        datetime.combine(fecha, hora) if modo_tiempo == "Punto en el tiempo" else None
+    )
+
+    _render_prediction_view(
+        bundle,
+        dt_punto=dt_punto,
+        dt_inicio=dt_inicio,
+        total_steps=total_steps,
+        tipo_label=tipo_label,
+        risk_filter=risk_filter,
+        velocidad=velocidad,
+    )
+
+
+# -------------------------------------------------
+# Vista de predicción (KPIs, tacómetros, tabla y mapa)
+# -------------------------------------------------
+@st.fragment
+def _render_prediction_view(
+    bundle,
+    dt_punto: datetime | None,
+    dt_inicio: datetime | None,
+    total_steps: int,
+    tipo_label: str,
+    risk_filter: str,
+    velocidad: float,
+) -> None:
+    """
+    Fragmento con los controles del cuerpo de la página (hora de la serie y
+    colonia). Cambiarlos solo vuelve a ejecutar esta vista, sin repetir el
+    tema, el CSS ni la barra lateral.
+    """
     # ================= CONTROL DE TIEMPO ==================
-    if modo_tiempo == "Punto en el tiempo":
-        dt_actual = datetime.combine(fecha, hora)
+    if dt_punto is not None:
+        dt_actual = dt_punto
     else:
         idx = st.slider(
             "Hora dentro de la serie",
@@ -152,13 +231,6 @@ para una fecha y hora específicas.
 
     colonia_col_map = _find_colonia_col(df_map_initial)
 
-    # ================= FILTROS DINÁMICOS ==================
-    risk_filter = st.sidebar.selectbox(
-        "Escala de riesgo (nivel global)",
-        ["Todos", "Muy bajo", "Bajo", "Medio", "Alto", "Muy alto"],
-        index=0,
-    )
-
     if colonia_col_map:
         colonias = sorted(df_map_initial[colonia_col_map].astype(str).unique())
         colonia_busqueda = st.selectbox(
@@ -169,19 +241,6 @@ para una fecha y hora específicas.
     else:
         colonia_busqueda = "Todas las colonias"
 
-    # ================= REPRODUCCIÓN AUTOMÁTICA ==================
-    reproducir = False
-    velocidad = 0.5
-    if modo_tiempo != "Punto en el tiempo":
-        velocidad = st.sidebar.slider(
-            "Velocidad de reproducción (seg/frame)",
-            min_value=0.1,
-            max_value=2.0,
-            value=0.5,
-            step=0.1,
-        )
-        reproducir = st.sidebar.button("▶ Iniciar reproducción")
-
     # =====================================================
     # RENDER INTERNO
     # =====================================================
@@ -237,253 +296,261 @@ para una fecha y hora específicas.
             )
 
             # ======================
-            # KPIs
+            # KPIs, TACÓMETROS, TABLA + MAPA
             # ======================
             prob_col = resolve_prob_column(tipo_label, df_map)
-            kpis = compute_kpis(df_map, prob_col)
+            _render_kpis(df_map, prob_col, tipo_label, colonia_busqueda, risk_filter)
+            _render_gauges(df_map, colonia_busqueda)
+            _render_table_and_map(df_map, prob_col, col_map, colonia_busqueda)
 
-            st.markdown(
-                f"""
-                <div class="kpi-grid-row1">
-
-                  <div class="kpi-card">
-                    <div class="kpi-label">Colonias analizadas</div>
-                    <div class="kpi-value">{kpis['total_colonias']}</div>
-                    <div class="kpi-subtext">
-                      {'Colonia: ' + colonia_busqueda if colonia_busqueda != 'Todas las colonias' else 'Todas las colonias'}
-                      &nbsp;|&nbsp;
-                      {'Riesgo: ' + risk_filter if risk_filter != 'Todos' else 'Todos los riesgos'}
-                    </div>
-                  </div>
-
-                  <div class="kpi-card alt-1">
-                    <div class="kpi-label">Promedio ({tipo_label})</div>
-                    <div class="kpi-value">{kpis['mean_prob']:.4f}</div>
-                    <div class="kpi-subtext">Promedio de probabilidad en el conjunto filtrado</div>
-                  </div>
-
-                  <div class="kpi-card alt-2">
-                    <div class="kpi-label">Máximo ({tipo_label})</div>
-                    <div class="kpi-value">{kpis['max_prob']:.4f}</div>
-                    <div class="kpi-subtext">Valor más alto del conjunto filtrado</div>
-                  </div>
-
-                  <div class="kpi-card alt-3">
-                    <div class="kpi-label">Colonias riesgo alto/muy alto</div>
-                    <div class="kpi-value">{kpis['high_risk_count']}</div>
-                    <div class="kpi-subtext">{kpis['high_risk_pct']:.1f}% del conjunto filtrado</div>
-                  </div>
-
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
+    # ================= PRIMER FRAME ==================
+    render_frame(
+        dt_actual,
+        tipo_label,
+        colonia_busqueda,
+        risk_filter,
+        precomputed=outputs_initial,
+    )
 
-            # =====================================================
-            # EXPANDER TACÓMETROS (sin el total)
-            # =====================================================
-            with st.expander("📊 Ver detalle por tipo de delito (tacómetros)"):
-                st.markdown("#### Probabilidad por tipo de delito")
-
-                prob_cols = [
-                    "prob_tipo_NON_CRIME_OTHER",
-                    "prob_tipo_LOW_IMPACT",
-                    "prob_tipo_ROBBERY_PERSON",
-                    "prob_tipo_ROBBERY_PROPERTY",
-                    "prob_tipo_LETHAL_VIOLENT",
-                    "prob_tipo_VIOLENT_OTHER",
-                ]
-                prob_cols = [c for c in prob_cols if c in df_map.columns]
-
-                gauge_data = []
-                if colonia_busqueda == "Todas las colonias":
-                    for col in prob_cols:
-                        gauge_data.append(
-                            {
-                                "grupo": SPANISH_COL_NAMES.get(col, col),
-                                "prob": float(df_map[col].mean()),
-                            }
-                        )
-                else:
-                    row0 = df_map.iloc[0]
-                    for col in prob_cols:
-                        gauge_data.append(
-                            {
-                                "grupo": SPANISH_COL_NAMES.get(col, col),
-                                "prob": float(row0[col]),
-                            }
-                        )
-
-                df_g = pd.DataFrame(gauge_data)
-
-                cols_t = st.columns(2)
-                for i, row in enumerate(df_g.itertuples()):
-                    col_ui = cols_t[i % 2]
-                    with col_ui:
-                        st.markdown(
-                            f"<div style='font-size:1.1rem;font-weight:700;"
-                            f"color:#93c5fd;text-align:center;margin-bottom:4px;'>{row.grupo}</div>",
-                            unsafe_allow_html=True,
-                        )
-
-                        df_seg = pd.DataFrame(
-                            {
-                                "segment": ["Probabilidad", "Restante"],
-                                "value": [row.prob, 1 - row.prob],
-                            }
-                        )
-
-                        base = (
-                            alt.Chart(df_seg)
-                            .mark_arc(innerRadius=35, outerRadius=70)
-                            .encode(
-                                theta=alt.Theta("value:Q"),
-                                color=alt.Color(
-                                    "segment:N",
-                                    scale=alt.Scale(
-                                        range=[
-                                            "#38bdf8",  # azul claro
-                                            "#020617",  # fondo
-                                        ]
-                                    ),
-                                    legend=None,
-                                ),
-                            )
-                            .properties(width=200, height=200)
-                        )
-
-                        text1 = (
-                            alt.Chart(pd.DataFrame({"t": [f"{row.prob:.2%}"]}))
-                            .mark_text(
-                                fontSize=22,
-                                fontWeight="bold",
-                                color="#F9FAFB",
-                            )
-                            .encode(text="t:N")
-                        )
-
-                        text2 = (
-                            alt.Chart(pd.DataFrame({"t": [f"{row.prob:.4f}"]}))
-                            .mark_text(
-                                dy=20,
-                                fontSize=11,
-                                color="#E5E7EB",
-                            )
-                            .encode(text="t:N")
-                        )
-
-                        st.altair_chart(base + text1 + text2, use_container_width=False)
-
-            # =====================================================
-            # TABLA + MAPA (side-by-side)
-            # =====================================================
-            st.markdown("### 📋 Colonias con probabilidad y mapa de riesgo")
-
-            tabla_col, mapa_col = st.columns([1.1, 1.9])
-
-            # ---------- TABLA ----------
-            with tabla_col:
-                col_name = SPANISH_COL_NAMES.get(prob_col, prob_col)
-
-                if col_map is None:
-                    st.warning("No se identificó la columna de colonia.")
-                else:
-                    df_show = df_map[[col_map, prob_col]].rename(
-                        columns={col_map: "Colonia", prob_col: col_name}
-                    )
+    # ================= REPRODUCCIÓN ==================
+    # Se lee del session_state: el botón solo vale True en la ejecución
+    # disparada por el clic, no en las re-ejecuciones del fragmento.
+    if dt_punto is None and st.session_state.get("btn_reproducir", False):
+        for step in range(total_steps):
+            dt_step = dt_inicio + timedelta(hours=step)
+            render_frame(dt_step, tipo_label, colonia_busqueda, risk_filter)
+            time.sleep(velocidad)
 
-                    # formato porcentaje
-                    df_show[col_name] = df_show[col_name].map(
-                        lambda x: f"{float(x) * 100:.2f}%"
-                    )
 
-                    styled = df_show.style.set_table_styles(
-                        [
-                            {
-                                "selector": "th",
-                                "props": [
-                                    ("background-color", "#1e3a8a"),
-                                    ("color", "white"),
-                                    ("font-size", "16px"),
-                                    ("font-weight", "bold"),
-                                ],
-                            }
-                        ]
-                    )
+# -------------------------------------------------
+# Secciones de la vista (cada frame las vuelve a dibujar)
+# -------------------------------------------------
+def _render_kpis(
+    df_map: pd.DataFrame,
+    prob_col: str,
+    tipo_label: str,
+    colonia_busqueda: str,
+    risk_filter: str,
+) -> None:
+    kpis = compute_kpis(df_map, prob_col)
+
+    filtro_colonia = (
+        "Colonia: " + colonia_busqueda
+        if colonia_busqueda != "Todas las colonias"
+        else "Todas las colonias"
+    )
+    filtro_riesgo = (
+        "Riesgo: " + risk_filter if risk_filter != "Todos" else "Todos los riesgos"
+    )
 
-                    st.dataframe(
-                        styled,
-                        hide_index=True,
-                        use_container_width=True,
-                    )
+    kpi_cards = (
+        (
+            "Colonias analizadas",
+            kpis["total_colonias"],
+            f"{filtro_colonia} &nbsp;|&nbsp; {filtro_riesgo}",
+        ),
+        (
+            f"Promedio ({tipo_label})",
+            f"{kpis['mean_prob']:.4f}",
+            "Promedio de probabilidad en el conjunto filtrado",
+        ),
+        (
+            f"Máximo ({tipo_label})",
+            f"{kpis['max_prob']:.4f}",
+            "Valor más alto del conjunto filtrado",
+        ),
+        (
+            "Colonias riesgo alto/muy alto",
+            kpis["high_risk_count"],
+            f"{kpis['high_risk_pct']:.1f}% del conjunto filtrado",
+        ),
+    )
+    st.markdown(_kpi_grid_html(kpi_cards), unsafe_allow_html=True)
 
-            # ---------- MAPA ----------
-            with mapa_col:
-                df_map["proba_mapa"] = df_map[prob_col].clip(0, 1)
 
-                # tamaño según prob
-                df_map["size"] = 50 + (df_map["proba_mapa"] ** 2) * 800
+def _render_gauges(df_map: pd.DataFrame, colonia_busqueda: str) -> None:
+    with st.expander("📊 Ver detalle por tipo de delito (tacómetros)"):
+        st.markdown("#### Probabilidad por tipo de delito")
 
-                # colores tipo heatmap
-                df_map["color_r"] = (df_map["proba_mapa"] * 255).astype(int)
-                df_map["color_g"] = (150 - df_map["proba_mapa"] * 150).astype(int)
-                df_map["color_b"] = 40
+        prob_cols = [c for c in TIPO_PROB_COLS if c in df_map.columns]
 
-                # 🔍 ZOOM MÁS ABIERTO PARA VER MEJOR LA CIUDAD
-                zoom = 11 if colonia_busqueda == "Todas las colonias" else 13
+        gauge_data = []
+        if colonia_busqueda == "Todas las colonias":
+            for col in prob_cols:
+                gauge_data.append(
+                    {
+                        "grupo": SPANISH_COL_NAMES.get(col, col),
+                        "prob": float(df_map[col].mean()),
+                    }
+                )
+        else:
+            row0 = df_map.iloc[0]
+            for col in prob_cols:
+                gauge_data.append(
+                    {
+                        "grupo": SPANISH_COL_NAMES.get(col, col),
+                        "prob": float(row0[col]),
+                    }
+                )
 
-                view = pdk.ViewState(
-                    latitude=float(df_map["lat"].mean()),
-                    longitude=float(df_map["lon"].mean()),
-                    zoom=zoom,
-                    pitch=0,
+        df_g = pd.DataFrame(gauge_data)
+
+        cols_t = st.columns(2)
+        for i, row in enumerate(df_g.itertuples()):
+            col_ui = cols_t[i % 2]
+            with col_ui:
+                st.markdown(
+                    f"<div style='font-size:1.1rem;font-weight:700;"
+                    f"color:#93c5fd;text-align:center;margin-bottom:4px;'>{row.grupo}</div>",
+                    unsafe_allow_html=True,
                 )
 
-                df_map["prob_pct"] = (df_map["proba_mapa"] * 100).round(2)
+                df_seg = pd.DataFrame(
+                    {
+                        "segment": ["Probabilidad", "Restante"],
+                        "value": [row.prob, 1 - row.prob],
+                    }
+                )
 
-                tooltip_html = (
-                    "<b>Colonia:</b> {" + (col_map or "colonia") + "}<br>"
-                    f"<b>{SPANISH_COL_NAMES.get(prob_col, prob_col)}:</b> {{prob_pct}}%"
+                base = (
+                    alt.Chart(df_seg)
+                    .mark_arc(innerRadius=35, outerRadius=70)
+                    .encode(
+                        theta=alt.Theta("value:Q"),
+                        color=alt.Color(
+                            "segment:N",
+                            scale=alt.Scale(
+                                range=[
+                                    "#38bdf8",  # azul claro
+                                    "#020617",  # fondo
+                                ]
+                            ),
+                            legend=None,
+                        ),
+                    )
+                    .properties(width=200, height=200)
                 )
 
-                layer = pdk.Layer(
-                    "ScatterplotLayer",
-                    df_map,
-                    get_position="[lon, lat]",
-                    get_radius="size",
-                    get_fill_color="[color_r, color_g, color_b, 220]",
-                    pickable=True,
-                    auto_highlight=True,
+                text1 = (
+                    alt.Chart(pd.DataFrame({"t": [f"{row.prob:.2%}"]}))
+                    .mark_text(
+                        fontSize=22,
+                        fontWeight="bold",
+                        color="#F9FAFB",
+                    )
+                    .encode(text="t:N")
                 )
 
-                deck = pdk.Deck(
-                    layers=[layer],
-                    initial_view_state=view,
-                    tooltip={
-                        "html": tooltip_html,
-                        "style": {
-                            "backgroundColor": "#020617",
-                            "color": "#F9FAFB",
-                            "fontSize": "12px",
-                        },
-                    },
-                    map_style="mapbox://styles/mapbox/dark-v11",
+                text2 = (
+                    alt.Chart(pd.DataFrame({"t": [f"{row.prob:.4f}"]}))
+                    .mark_text(
+                        dy=20,
+                        fontSize=11,
+                        color="#E5E7EB",
+                    )
+                    .encode(text="t:N")
                 )
 
-                st.pydeck_chart(deck, use_container_width=True, height=550)
+                st.altair_chart(base + text1 + text2, use_container_width=False)
 
-    # ================= PRIMER FRAME ==================
-    render_frame(
-        dt_actual,
-        tipo_label,
-        colonia_busqueda,
-        risk_filter,
-        precomputed=outputs_initial,
-    )
 
-    # ================= REPRODUCCIÓN ==================
-    if modo_tiempo != "Punto en el tiempo" and reproducir:
-        for step in range(total_steps):
-            dt_step = dt_inicio + timedelta(hours=step)
-            render_frame(dt_step, tipo_label, colonia_busqueda, risk_filter)
-            time.sleep(velocidad)
+def _render_table_and_map(
+    df_map: pd.DataFrame,
+    prob_col: str,
+    col_map: str | None,
+    colonia_busqueda: str,
+) -> None:
+    st.markdown("### 📋 Colonias con probabilidad y mapa de riesgo")
+
+    tabla_col, mapa_col = st.columns([1.1, 1.9])
+
+    # ---------- TABLA ----------
+    with tabla_col:
+        col_name = SPANISH_COL_NAMES.get(prob_col, prob_col)
+
+        if col_map is None:
+            st.warning("No se identificó la columna de colonia.")
+        else:
+            df_show = df_map[[col_map, prob_col]].rename(
+                columns={col_map: "Colonia", prob_col: col_name}
+            )
+
+            # formato porcentaje
+            df_show[col_name] = df_show[col_name].map(
+                lambda x: f"{float(x) * 100:.2f}%"
+            )
+
+            styled = df_show.style.set_table_styles(
+                [
+                    {
+                        "selector": "th",
+                        "props": [
+                            ("background-color", "#1e3a8a"),
+                            ("color", "white"),
+                            ("font-size", "16px"),
+                            ("font-weight", "bold"),
+                        ],
+                    }
+                ]
+            )
+
+            st.dataframe(
+                styled,
+                hide_index=True,
+                use_container_width=True,
+            )
+
+    # ---------- MAPA ----------
+    with mapa_col:
+        df_map["proba_mapa"] = df_map[prob_col].clip(0, 1)
+
+        # tamaño según prob
+        df_map["size"] = 50 + (df_map["proba_mapa"] ** 2) * 800
+
+        # colores tipo heatmap
+        df_map["color_r"] = (df_map["proba_mapa"] * 255).astype(int)
+        df_map["color_g"] = (150 - df_map["proba_mapa"] * 150).astype(int)
+        df_map["color_b"] = 40
+
+        # 🔍 ZOOM MÁS ABIERTO PARA VER MEJOR LA CIUDAD
+        zoom = 11 if colonia_busqueda == "Todas las colonias" else 13
+
+        view = pdk.ViewState(
+            latitude=float(df_map["lat"].mean()),
+            longitude=float(df_map["lon"].mean()),
+            zoom=zoom,
+            pitch=0,
+        )
+
+        df_map["prob_pct"] = (df_map["proba_mapa"] * 100).round(2)
+
+        tooltip_html = (
+            "<b>Colonia:</b> {" + (col_map or "colonia") + "}<br>"
+            f"<b>{SPANISH_COL_NAMES.get(prob_col, prob_col)}:</b> {{prob_pct}}%"
+        )
+
+        layer = pdk.Layer(
+            "ScatterplotLayer",
+            df_map,
+            get_position="[lon, lat]",
+            get_radius="size",
+            get_fill_color="[color_r, color_g, color_b, 220]",
+            pickable=True,
+            auto_highlight=True,
+        )
+
+        deck = pdk.Deck(
+            layers=[layer],
+            initial_view_state=view,
+            tooltip={
+                "html": tooltip_html,
+                "style": {
+                    "backgroundColor": "#020617",
+                    "color": "#F9FAFB",
+                    "fontSize": "12px",
+                },
+            },
+            map_style="mapbox://styles/mapbox/dark-v11",
+        )
+
+        st.pydeck_chart(deck, use_container_width=True, height=550)
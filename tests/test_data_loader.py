@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+from core import data_loader
+
+
+@pytest.fixture
+def central_csv(tmp_path, monkeypatch):
+    """Point the central dataset paths at a temporary directory."""
+    csv_path = tmp_path / "FGJ_CLEAN_Final.csv"
+    monkeypatch.setattr(data_loader, "DATASET_PATH", csv_path)
+    monkeypatch.setattr(data_loader, "DATASET_PARQUET_PATH", csv_path.with_suffix(".parquet"))
+    monkeypatch.setattr(data_loader, "DATASET_ARROW_PATH", csv_path.with_suffix(".arrow"))
+    data_loader.load_central_dataset.clear()
+    yield csv_path
+    data_loader.load_central_dataset.clear()
+
+
+def test_load_append_save_round_trip(central_csv):
+    pd.DataFrame(
+        {
+            "fecha_hecho": ["2024-01-15", "2024-02-10"],
+            "alcaldia_hecho": ["IZTAPALAPA", "COYOACAN"],
+            "delito_grupo": ["ROBO_CASA", "HOMICIDIO"],
+            "latitud": [19.35, 19.33],
+        }
+    ).to_csv(central_csv, index=False)
+    central = data_loader.load_central_dataset()
+    assert pd.api.types.is_datetime64_any_dtype(central["fecha_hecho"])
+
+    # Batch as the EDA pipeline returns it: dates still as text
+    batch = pd.DataFrame(
+        {
+            "fecha_hecho": ["2024-03-01", None],
+            "alcaldia_hecho": ["COYOACAN", "TLALPAN"],
+            "delito_grupo": ["ROBO_CASA", "ROBO_CASA"],
+            "latitud": [19.30, None],
+        }
+    )
+    combined = data_loader.combine_with_central(central, batch)
+    data_loader.save_central_dataset(combined)
+
+    reloaded = data_loader.load_central_dataset()
+    assert data_loader.active_dataset_path() == data_loader.DATASET_ARROW_PATH
+    assert len(reloaded) == 4
+    assert pd.api.types.is_datetime64_any_dtype(reloaded["fecha_hecho"])
+    assert reloaded["fecha_hecho"].iloc[2] == pd.Timestamp("2024-03-01")
+    assert pd.isna(reloaded["fecha_hecho"].iloc[3])
+    assert reloaded["alcaldia_hecho"].tolist() == [
+        "IZTAPALAPA",
+        "COYOACAN",
+        "COYOACAN",
+        "TLALPAN",
+    ]
+
+
+def test_save_mixed_object_column(central_csv):
+    # Text mixed with Timestamps and numbers is stored as text
+    df = pd.DataFrame(
+        {
+            "colonia_hecho": ["CENTRO", pd.Timestamp("2024-01-01"), 7, None],
+            "latitud": [19.4, 19.3, None, 19.2],
+        }
+    )
+    data_loader.save_central_dataset(df)
+
+    reloaded = data_loader.load_central_dataset()
+    assert reloaded["colonia_hecho"].tolist()[:3] == ["CENTRO", "2024-01-01 00:00:00", "7"]
+    assert pd.isna(reloaded["colonia_hecho"].iloc[3])
+    assert not list(central_csv.parent.glob("*.tmp"))
+
+
+def test_dataset_version_changes_on_reload(central_csv):
+    pd.DataFrame({"delito_grupo": ["ROBO_CASA"]}).to_csv(central_csv, index=False)
+    first = data_loader.load_central_dataset()
+    version = data_loader.dataset_version(first)
+    assert version is not None
+    assert data_loader.dataset_version(first.copy()) is None
+
+    data_loader.save_central_dataset(first)
+    second = data_loader.load_central_dataset()
+    assert data_loader.dataset_version(second) not in (None, version)
+    assert data_loader.dataset_version(first) is None
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from EDA.update_base import fill_competencia
+
+
+def test_fill_competencia_alcaldia_without_competencia():
+    # TLALPAN has no competencia at all; its categorical group stays empty
+    df = pd.DataFrame(
+        {
+            "alcaldia_hecho": pd.Categorical(
+                ["TLALPAN", "COYOACAN", "COYOACAN", "COYOACAN"],
+                categories=["COYOACAN", "IZTAPALAPA", "TLALPAN"],
+            ),
+            "competencia": [None, "LOCAL", "LOCAL", None],
+        }
+    )
+    out, stats = fill_competencia(df)
+    assert out["competencia"].tolist() == ["DESCONOCIDO", "LOCAL", "LOCAL", "LOCAL"]
+    assert stats["rellenos_por_moda_alcaldia"] == 1
+    assert stats["asignados_desconocido"] == 1
+
+
+def test_fill_competencia_rows_without_alcaldia_use_their_own_mode():
+    df = pd.DataFrame(
+        {
+            "alcaldia_hecho": [np.nan, np.nan, np.nan, "A", "A"],
+            "competencia": ["LOCAL", "LOCAL", None, "FEDERAL", None],
+        }
+    )
+    out, stats = fill_competencia(df)
+    assert out["competencia"].tolist() == ["LOCAL", "LOCAL", "LOCAL", "FEDERAL", "FEDERAL"]
+    assert stats["asignados_desconocido"] == 0
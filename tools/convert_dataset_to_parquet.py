@@ -0,0 +1,42 @@
+"""
+One-time utility script to convert the central dataset CSV to Parquet.
+
+This script is not used by Streamlit at runtime. It is intended to be
+executed manually by a developer after the CSV changes, so that
+core.data_loader can load the columnar copy instead of parsing text.
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.data_loader import (  # noqa: E402
+    DATASET_PATH,
+    DATASET_PARQUET_PATH,
+    PARQUET_ROW_GROUP_SIZE,
+)
+
+
+def main() -> None:
+    """Read the CSV dataset and export it as ZSTD-compressed Parquet."""
+    print(f"Reading CSV from: {DATASET_PATH}")
+    df = pd.read_csv(DATASET_PATH, low_memory=False)
+
+    print(f"Writing Parquet to: {DATASET_PARQUET_PATH}")
+    df.to_parquet(
+        DATASET_PARQUET_PATH,
+        engine="pyarrow",
+        compression="zstd",
+        index=False,
+        row_group_size=PARQUET_ROW_GROUP_SIZE,
+    )
+    print("Conversion completed successfully.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 # ui/theme_dark.py
 
+from pathlib import Path
+
 import streamlit as st
 
+UI_DIR = Path(__file__).resolve().parent
+KPI_CSS_PATH = UI_DIR / "kpi_styles.css"
+
 
 def apply_theme():
     css = """
@@ -169,3 +174,26 @@ def apply_theme():
 
 def inject_dark_theme():
     apply_theme()
+
+
+@st.cache_data(show_spinner=False)
+def _read_css(path: str):
+    """Read a stylesheet once per process; None if it does not exist."""
+    css_path = Path(path)
+    if not css_path.exists():
+        return None
+    return css_path.read_text(encoding="utf-8")
+
+
+def inject_css_file(path) -> bool:
+    """Inject a stylesheet from disk. Returns False if the file is missing."""
+    css = _read_css(str(path))
+    if css is None:
+        return False
+    st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
+    return True
+
+
+def inject_kpi_styles() -> bool:
+    """Inject ui/kpi_styles.css. Returns False if the file is missing."""
+    return inject_css_file(KPI_CSS_PATH)